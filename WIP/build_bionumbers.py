@@ -0,0 +1,51 @@
+from shared.bionumbers.parse import SHARD_SIZE
+from shared.bionumbers.qa_output import (
+    debug_categorization,
+    analyze_property_types,
+    analyze_property_details
+)
+from shared.bionumbers.products import (
+    PRODUCTS,
+    clean_products,
+    save_product
+)
+from datetime import date
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate every BioNumbers size product from a single load of the raw data'
+    )
+    parser.add_argument('--products', nargs='+', choices=list(PRODUCTS), default=list(PRODUCTS),
+                      help='Products to build (default: all)')
+    parser.add_argument('--qa', action='store_true',
+                      help='Print the categorization and property type QA for each product')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Number of processes to clean the data with (loads the whole export instead of streaming it)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE,
+                      help='Rows per shard when using more than one worker')
+    args = parser.parse_args()
+
+    # Read and fingerprint the raw data once, parsing the rows of every
+    # product together and then splitting them per product
+    size_data, source_hash, fingerprints = clean_products(
+        args.products, workers=args.workers, shard_size=args.shard_size
+    )
+
+    today = date.today().strftime("%Y_%m_%d")
+    for name in args.products:
+        if args.qa:
+            print(f"\n=== {name} ===")
+            debug_categorization(size_data[name])
+            analyze_property_types(size_data[name])
+            analyze_property_details(size_data[name], "Diameter")
+
+        saved = save_product(name, size_data[name], source_hash, fingerprints, today=today)
+
+        print(f"\n{name}:")
+        for output, frame in saved.items():
+            print(f"  {output}: {len(frame)} entries")
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,28 @@
-import pandas as pd
-from prettytable import PrettyTable
-import glob
-import os
+import argparse
+from shared.bionumbers.schema import (
+    observed_counts,
+    read_selection,
+    add_as_of_argument,
+    MEASUREMENT_TABLE_COLUMNS,
+    MEASUREMENT_NA_REP
+)
+from shared.table_render import render_table, add_table_arguments, render_options
+from shared.bionumbers.query import ECOLI_SIZES
 
-def get_latest_output_file():
-    """Get the most recent output file from the output directory"""
-    output_dir = "./cell_size_dataset/output/"
-    files = glob.glob(os.path.join(output_dir, "processed_size_data_*.csv"))
-    if not files:
-        raise FileNotFoundError("No output files found")
-    return max(files, key=os.path.getctime)
+# Columns read from the output besides the table's: those filtered, sorted
+# and summarized on
+OTHER_COLUMNS = [
+    'Organism', 'category', 'standardized_value', 'standardized_min'
+]
 
-def analyze_ecoli_data():
-    # Load the latest data file
-    latest_file = get_latest_output_file()
-    df = pd.read_csv(latest_file)
-    
-    # Filter for E. coli and Generic data
-    mask = (df['Organism'].isin(['Bacteria Escherichia coli', 'Generic']))
-    filtered_data = df[mask].copy()
-    
-    # Apply additional filters
-    mask = (
-        # E. coli specific filters
-        (
-            (filtered_data['property_type'].str.lower() == 'radius') |
-            (filtered_data['property_type'].str.lower() == 'diameter') |
-            (filtered_data['property_type'].str.lower() == 'size')
-        )
+OUTPUT_DIR = "./cell_size_dataset/output/"
+PRODUCT = "processed_size_data"
+
+def analyze_ecoli_data(as_of=None, **table_options):
+    # Load the E. coli and Generic sizes of the latest data file
+    _, _, filtered_data = read_selection(
+        OUTPUT_DIR, PRODUCT, ECOLI_SIZES, MEASUREMENT_TABLE_COLUMNS, OTHER_COLUMNS, as_of
     )
-    filtered_data = filtered_data[mask]
     
     # Sort by organism first, then by property type and values
     filtered_data = filtered_data.sort_values(
@@ -37,41 +30,19 @@ def analyze_ecoli_data():
         na_position='last'
     )
     
-    # Create table
-    table = PrettyTable()
-    table.field_names = [
-        "Property Type",
-        "Property Of",
-        "Value",
-        "Min",
-        "Max", 
-        "Units"
-    ]
-    
-    # Configure table appearance
-    table.align = "l"  # Left align text
-    table.max_width = 40  # Limit column width
-    
-    # Add data rows
-    for _, row in filtered_data.iterrows():
-        table.add_row([
-            str(row['property_type'])[:40],
-            str(row['property_of'])[:40],
-            row['value'] if pd.notna(row['value']) else '',
-            row['min_value'] if pd.notna(row['min_value']) else '',
-            row['max_value'] if pd.notna(row['max_value']) else '',
-            row['Units']
-        ])
-    
     # Print summary
     print("\nSize Measurements:")
     print(f"Total entries: {len(filtered_data)}")
     print("\nBreakdown by organism:")
-    print(filtered_data['Organism'].value_counts())
+    print(observed_counts(filtered_data['Organism']))
     print("\nBreakdown by category:")
-    print(filtered_data['category'].value_counts())
+    print(observed_counts(filtered_data['category']))
     print("\nDetailed measurements:")
-    print(table)
+    render_table(filtered_data, MEASUREMENT_TABLE_COLUMNS, na_rep=MEASUREMENT_NA_REP, **table_options)
 
 if __name__ == "__main__":
-    analyze_ecoli_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    add_as_of_argument(parser)
+    add_table_arguments(parser)
+    args = parser.parse_args()
+    analyze_ecoli_data(args.as_of, **render_options(args))
@@ -1,56 +1,32 @@
-from shared.util import (
-    load_bionumbers_data
-)
-from shared.bionumbers.parse import (
-    clean_size_data
-)
+from shared.bionumbers.parse import SHARD_SIZE
 from shared.bionumbers.qa_output import (
     debug_categorization,
     analyze_property_types,
     analyze_property_details
 )
-from datetime import date
+from shared.bionumbers.products import (
+    clean_products,
+    save_product
+)
+import argparse
 
 
+PRODUCT = "processed_size_data"
 
-CELL_SIZE_EXCLUDE_KEYWORDS = [
-    'rate', 'constant', 'time', 'energy', 'force',
-    'concentration', 'abundance', 'number', 'strength',
-    'half-life', 'buffering capacity', 'thickness',
-    'density', 'weight', 'mass',
-    'ratio', 'fraction', 'percentage',
-    'selection coefficient', 'flux through',
-    'net pressure', 'maximum level',
-    'various kinds', 'rapidly degrading', 'free level',
-    'ph of', 'physical parameters', 'variation in',
-    'probability of', 'power', 'population', 'turnover of',
-    'activity of', 'translational diffusion', 'halflives of',
-    'affinity of', 'processivity of', 'speed of',
-    'diffusion coefficient', 'elemental composition',
-    'kinetic parameters', 'cytoplasmic ph', 'periplasmic ph',
-    'lacz mrna per', 'percent of heat shock', 'half-lives of',
-    'No. of ribosomes', 'comparison of channel counts', 'peak level of',
-    'reads per kilobase', 'review course', 'cutoff value', 'half life of',
-    'wavelength for', 'distance on', 'residual bulk', 'halflife of',
-    'contribution of', 'twenty most', 'internal ph', 'different temperatures',
-    'precursor requirements', 'cell dry yield', 'most abundant', 'protein copies',
-    'increase in', 'decrease in', 'co-segregation', 'cosegregation', 'replication speed',
-    'cellular location', 'resting potential', 'donnan potential', 'odor thresholds', 'halflife',
-    'peak in', 'oscillations', 'in the following organisms', 'atp demand', 'mechanoelectrical sensitivity',
-    'pool turnover', 'per unit', 'on tryptophan', 'of ocean water', 'volume usage', 'volume variation',
-    'volume, growth, and yield'
-]
 
 def main():
-    # Load data
-    df = load_bionumbers_data()
-
-    # Process and clean the data
-    size_data = clean_size_data(
-        df, 
-        general_size_only=True,
-        exclude_keywords=CELL_SIZE_EXCLUDE_KEYWORDS
+    parser = argparse.ArgumentParser(description='Generate the cell size dataset from Bionumbers')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Number of processes to clean the data with (loads the whole export instead of streaming it)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE,
+                      help='Rows per shard when using more than one worker')
+    args = parser.parse_args()
+
+    # Load, process and clean the data
+    size_data, source_hash, fingerprints = clean_products(
+        [PRODUCT], workers=args.workers, shard_size=args.shard_size
     )
+    size_data = size_data[PRODUCT]
 
     # Debug categorization
     debug_categorization(size_data)
@@ -61,11 +37,8 @@ def main():
     # Analyze specific property type
     analyze_property_details(size_data, "Diameter")
     
-    # Sort by Organism and save processed data with today's date
-    size_data_sorted = size_data.sort_values(['Organism', 'standardized_min'])
-    today = date.today().strftime("%Y_%m_%d")
-    output_path = f"./cell_size_dataset/output/processed_size_data_{today}.csv"
-    size_data_sorted.to_csv(output_path, index=False)
+    # Save processed data with today's date
+    save_product(PRODUCT, size_data, source_hash, fingerprints)
 
     # Print summary
     print("\nData Summary:")
@@ -1,23 +1,33 @@
-import pandas as pd
-from prettytable import PrettyTable
-import glob
-import os
+import argparse
+from shared.bionumbers.schema import (
+    observed_counts,
+    read_selection,
+    add_as_of_argument,
+    MEASUREMENT_TABLE_COLUMNS,
+    MEASUREMENT_NA_REP
+)
+from shared.table_render import render_table, add_table_arguments, render_options
+from shared.bionumbers.query import CELL_VOLUMES
+from shared.bionumbers.interval_index import load_interval_index
 
-def get_latest_output_file():
-    """Get the most recent output file from the output directory"""
-    output_dir = "./cell_volume_dataset/output/"
-    files = glob.glob(os.path.join(output_dir, "processed_cell_volume_data_*.csv"))
-    if not files:
-        raise FileNotFoundError("No output files found")
-    return max(files, key=os.path.getctime)
+# Table headers and the columns they show
+TABLE_COLUMNS = {"Organism": 'Organism', **MEASUREMENT_TABLE_COLUMNS}
 
-def analyze_cell_volumes():
-    # Load the latest data file
-    latest_file = get_latest_output_file()
-    df = pd.read_csv(latest_file)
-    
-    # Filter for Cell volume entries (case insensitive)
-    filtered_data = df[df['Properties'].str.lower() == 'cell volume'].copy()
+# Columns read from the output besides the table's: those filtered, sorted
+# and summarized on
+OTHER_COLUMNS = [
+    'Properties', 'category', 'standardized_dimension',
+    'standardized_value', 'standardized_min', 'standardized_max'
+]
+
+OUTPUT_DIR = "./cell_volume_dataset/output/"
+PRODUCT = "processed_cell_volume_data"
+
+def analyze_cell_volumes(as_of=None, **table_options):
+    # Load the Cell volume entries (case insensitive) of the latest data file
+    latest_file, df, filtered_data = read_selection(
+        OUTPUT_DIR, PRODUCT, CELL_VOLUMES, TABLE_COLUMNS, OTHER_COLUMNS, as_of
+    )
     
     # Sort by standardized value/min for consistent ordering
     filtered_data = filtered_data.sort_values(
@@ -25,43 +35,29 @@ def analyze_cell_volumes():
         na_position='last'
     )
     
-    # Create table
-    table = PrettyTable()
-    table.field_names = [
-        "Organism",
-        "Property Type",
-        "Property Of",
-        "Value",
-        "Min",
-        "Max", 
-        "Units"
-    ]
-    
-    # Configure table appearance
-    table.align = "l"  # Left align text
-    table.max_width = 40  # Limit column width
-    
-    # Add data rows
-    for _, row in filtered_data.iterrows():
-        table.add_row([
-            row['Organism'],
-            row['property_type'],
-            str(row['property_of'])[:40],
-            row['value'] if pd.notna(row['value']) else '',
-            row['min_value'] if pd.notna(row['min_value']) else '',
-            row['max_value'] if pd.notna(row['max_value']) else '',
-            row['Units']
-        ])
-    
     # Print summary
     print("\nCell Volume Measurements:")
     print(f"Total entries: {len(filtered_data)}")
     print("\nBreakdown by organism:")
-    print(filtered_data['Organism'].value_counts())
+    print(observed_counts(filtered_data['Organism']))
     print("\nBreakdown by category:")
-    print(filtered_data['category'].value_counts())
+    print(observed_counts(filtered_data['category']))
     print("\nDetailed measurements:")
-    print(table)
+    render_table(filtered_data, TABLE_COLUMNS, na_rep=MEASUREMENT_NA_REP, **table_options)
+
+    # Volume distribution of the whole dataset, from its saved range index.
+    # Outputs written before standardized_dimension existed have no volume
+    # rows to index.
+    if 'standardized_dimension' not in df.columns:
+        return
+    interval_index = load_interval_index(latest_file, df)
+    if 'volume' in interval_index.partitions:
+        print("\nVolumes by category (rows per decade, lower edge as log10 m³):")
+        print(interval_index.log_histogram('volume'))
 
 if __name__ == "__main__":
-    analyze_cell_volumes() 
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    add_as_of_argument(parser)
+    add_table_arguments(parser)
+    args = parser.parse_args()
+    analyze_cell_volumes(args.as_of, **render_options(args))
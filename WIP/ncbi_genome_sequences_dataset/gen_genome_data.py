@@ -2,13 +2,33 @@
 
 import subprocess
 import json
+import gzip
+import math
+import hashlib
+import threading
+import numpy as np
 import pandas as pd
-from datetime import date
+from datetime import date, datetime, timezone
 import argparse
 import logging
 from pathlib import Path
 import sys
 import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Set up logging
 logging.basicConfig(
@@ -35,16 +55,41 @@ TAXON_ID_MAP = {
 }
 
 
+# Date format of the datasets --released-after option
+RELEASED_AFTER_FORMAT = '%m/%d/%Y'
+
+# NCBI datasets executable, overridable with the DATASETS_BIN environment
+# variable or --datasets-bin (e.g. to point at a stub for testing)
+DATASETS_BIN = os.environ.get('DATASETS_BIN', 'datasets')
+
+# Where datasets responses are cached when caching is asked for (or replayed
+# from in offline mode), and for how long (seconds) they are replayed
+# instead of querying NCBI again
+CACHE_DIR = 'cache'
+CACHE_TTL = 24 * 3600
+
+# Snapshot directories under the output directory, and the file the
+# cumulative curves of all of them are collected in
+SNAPSHOT_DIR_PATTERN = re.compile(r'\d{4}_\d{2}_\d{2}')
+CUMULATIVE_HISTORY_FILE = 'cumulative_history.csv'
+HISTORY_COLUMNS = ['snapshot', 'signature', 'taxon', 'year', 'genomes']
+
+# Taxa queried at the same time, and how failed queries are retried
+CONCURRENCY = 3
+RETRIES = 2
+RETRY_BACKOFF = 5.0
+
+
 def setup_directories():
     """Create necessary directories if they don't exist."""
     for dir_name in ['output', 'logs']:
         Path(dir_name).mkdir(exist_ok=True)
 
 
-def check_datasets_installation():
+def check_datasets_installation(datasets_bin=DATASETS_BIN):
     """Verify that the NCBI datasets tool is installed."""
     try:
-        result = subprocess.run(['datasets', '--version'], 
+        result = subprocess.run([datasets_bin, '--version'], 
                               capture_output=True, 
                               text=True)
         logging.info(f"NCBI datasets version: {result.stdout.strip()}")
@@ -54,143 +99,489 @@ def check_datasets_installation():
         return False
 
 
-def query_genome_data(taxon_id):
-    """Query NCBI datasets for genome data."""
+def genome_summary_command(taxon_id, datasets_bin=DATASETS_BIN, released_after=None):
+    """datasets command listing the genome assemblies of a taxon.
+
+    With released_after (YYYY-MM-DD, as in the release dates of the
+    summaries), only assemblies released on or after that date are listed.
+    It is passed on in the MM/DD/YYYY form the datasets CLI documents.
+    """
     cmd = [
-        'datasets', 'summary', 'genome', 
+        datasets_bin, 'summary', 'genome', 
         'taxon', str(taxon_id),
         '--assembly-level', 'chromosome,complete',
         '--as-json-lines'
     ]
-    
-    logging.info(f"Running command: {' '.join(cmd)}")
-    
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            logging.error(f"Error querying NCBI: {result.stderr}")
-            return None
-            
-        # Parse JSON lines output
-        data = []
-        for line in result.stdout.splitlines():
+    if released_after is not None:
+        released_after = date.fromisoformat(released_after).strftime(RELEASED_AFTER_FORMAT)
+        cmd += ['--released-after', released_after]
+    return cmd
+
+
+def stream_lines(cmd):
+    """Run cmd and yield each non-empty line of its stdout as it is read.
+
+    Raises RuntimeError with the command's stderr if it exits with an error.
+    """
+    # stderr goes to a temporary file so a chatty command cannot block on a
+    # full pipe while we are reading stdout
+    with tempfile.TemporaryFile() as stderr, \
+            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr) as proc:
+        for line in proc.stdout:
             if line.strip():
-                try:
-                    entry = json.loads(line)
-                    # Only process entries that have assembly info
-                    if 'assembly_info' in entry:
-                        data.append(entry)
-                except json.JSONDecodeError as e:
-                    logging.warning(f"Failed to parse JSON line: {e}")
+                yield line
+        proc.wait()
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(stderr.read().decode(errors='replace').strip())
+
+
+class ResponseCache:
+    """Gzipped datasets responses on disk, keyed by the command's arguments.
+
+    A response younger than ttl seconds is replayed instead of running the
+    command. In offline mode any cached response is replayed regardless of
+    its age, and a command without one fails instead of running. Responses
+    fetched live are stored as they stream in and only become visible once
+    the command has succeeded. With record_dir, each response, live or
+    replayed, is also stored there as a fixture that never expires; replay
+    fixtures by using record_dir as the cache_dir in offline mode.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, offline=False, record_dir=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+        self.record_dir = record_dir
+
+    @staticmethod
+    def key(cmd):
+        """Cache key of a command: a hash of its arguments, not the executable."""
+        return hashlib.sha256(json.dumps(cmd[1:]).encode()).hexdigest()[:24]
+
+    def _paths(self, directory, cmd):
+        base = Path(directory) / self.key(cmd)
+        return base.with_suffix('.jsonl.gz'), base.with_suffix('.json')
+
+    def lookup(self, cmd):
+        """Path of a usable cached response to cmd, or None.
+
+        A response whose metadata cannot be read is treated as missing.
+        """
+        if self.cache_dir is None:
+            return None
+        path, meta_path = self._paths(self.cache_dir, cmd)
+        if not (path.exists() and meta_path.exists()):
+            return None
+        if self.offline:
+            return path
+        try:
+            with open(meta_path) as f:
+                created_at = datetime.fromisoformat(json.load(f)['created_at'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring cached response {path.name} with unreadable metadata: {e}")
+            return None
+        age = (datetime.now(timezone.utc) - created_at).total_seconds()
+        return path if age < self.ttl else None
+
+    def stream_lines(self, cmd):
+        """stream_lines(cmd), replayed from the cache when possible."""
+        path = self.lookup(cmd)
+        if path is not None:
+            logging.info(f"Replaying cached response {path.name} instead of querying NCBI for: {' '.join(cmd[1:])}")
+            if self.record_dir is not None:
+                self._record(cmd)
+            with gzip.open(path, 'rb') as f:
+                yield from f
+            return
+        if self.offline:
+            raise FileNotFoundError(f"No cached response for: {' '.join(cmd[1:])}")
+        yield from self._stream_and_store(cmd)
+
+    def _record(self, cmd):
+        """Copy the cached response to cmd into record_dir, metadata first."""
+        Path(self.record_dir).mkdir(parents=True, exist_ok=True)
+        for source, target in zip(self._paths(self.cache_dir, cmd)[::-1],
+                                  self._paths(self.record_dir, cmd)[::-1]):
+            if target.exists() and target.samefile(source):
+                return
+            tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+
+    def _stream_and_store(self, cmd):
+        directories = [d for d in (self.cache_dir, self.record_dir) if d is not None]
+        targets = []
+        for directory in directories:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            path, meta_path = self._paths(directory, cmd)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            targets.append((path, meta_path, tmp_path, gzip.open(tmp_path, 'wb', compresslevel=6)))
+
+        lines = 0
+        complete = False
+        try:
+            for line in stream_lines(cmd):
+                for target in targets:
+                    target[3].write(line)
+                lines += 1
+                yield line
+            complete = True
+        finally:
+            for path, meta_path, tmp_path, writer in targets:
+                writer.close()
+                if not complete:
+                    os.remove(tmp_path)
                     continue
-        
-        logging.info(f"Retrieved {len(data)} genome entries")
-        return data
-    except Exception as e:
-        logging.error(f"Error processing NCBI data: {e}")
+                # Publish the metadata first, so a response is never visible
+                # without it
+                meta_tmp_path = tmp_path.with_suffix('.json.tmp')
+                with open(meta_tmp_path, 'w') as f:
+                    json.dump({
+                        'args': cmd[1:],
+                        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                        'lines': lines
+                    }, f, indent=2)
+                os.replace(meta_tmp_path, meta_path)
+                os.replace(tmp_path, path)
+
+
+# Columns of the per-taxon genome CSVs, before collection_date
+GENOME_COLUMNS = [
+    'assembly_accession', 'assembly_name', 'organism_name',
+    'organism_taxonomic_id', 'assembly_release_date', 'assembly_release_year',
+    'checkm_completeness', 'checkm_completeness_percentile',
+    'checkm_contamination', 'checkm_version', 'checkm_marker_count'
+]
+
+# Decoded columns by the part of an assembly summary they are read from
+# (None for top-level fields), mapped to their field names there and the
+# type declared for them. assembly_release_year is derived from the release
+# dates.
+GENOME_FIELDS = {
+    None: {
+        'assembly_accession': ('accession', str)
+    },
+    'assembly_info': {
+        'assembly_name': ('assembly_name', str),
+        'assembly_release_date': ('release_date', str)
+    },
+    'organism': {
+        'organism_name': ('organism_name', str),
+        'organism_taxonomic_id': ('tax_id', int)
+    },
+    'checkm_info': {
+        'checkm_completeness': ('completeness', float),
+        'checkm_completeness_percentile': ('completeness_percentile', float),
+        'checkm_contamination': ('contamination', float),
+        'checkm_version': ('checkm_version', str),
+        'checkm_marker_count': ('marker_count', int)
+    }
+}
+
+# Columns of a decoded record, in order
+DECODED_COLUMNS = [column for fields in GENOME_FIELDS.values() for column in fields]
+
+
+def _struct_fields(fields):
+    """msgspec field specs of a GENOME_FIELDS part, each optional."""
+    return [(field, field_type | None, None) for field, field_type in fields.values()]
+
+
+def _checked_summary(summary):
+    """Check a decoded summary against the types in GENOME_FIELDS, as msgspec does.
+
+    A declared field may be missing, null or of its declared type, where a
+    float field also takes an integer (converted to float); anything else
+    raises ValueError. Returns the summary.
+    """
+    if not isinstance(summary, dict):
+        raise ValueError(f"Expected `object`, got `{type(summary).__name__}`")
+    for part_name, fields in GENOME_FIELDS.items():
+        part = summary if part_name is None else summary.get(part_name)
+        if part is None:
+            continue
+        if not isinstance(part, dict):
+            raise ValueError(f"Expected `object | null`, got `{type(part).__name__}` - at `$.{part_name}`")
+        for field, field_type in fields.values():
+            value = part.get(field)
+            if value is None:
+                continue
+            if field_type is float and type(value) is int:
+                part[field] = float(value)
+            elif type(value) is not field_type or (field_type is float and not math.isfinite(value)):
+                path = f"$.{field}" if part_name is None else f"$.{part_name}.{field}"
+                raise ValueError(
+                    f"Expected `{field_type.__name__} | null`, got `{value!r}` - at `{path}`"
+                )
+    return summary
+
+
+if msgspec is not None:
+    # Typed view of the fields of an assembly summary listed in
+    # GENOME_FIELDS, with their declared types. msgspec skips every other
+    # field (assembly_stats, annotation_info, ...) without building Python
+    # objects for it, and raises a ValidationError (a DecodeError) for a
+    # line whose fields have other types.
+    AssemblySummary = msgspec.defstruct('AssemblySummary', _struct_fields(GENOME_FIELDS[None]) + [
+        (part_name, msgspec.defstruct(part_name, _struct_fields(fields)) | None, None)
+        for part_name, fields in GENOME_FIELDS.items() if part_name is not None
+    ])
+
+    JSON_DECODER = 'msgspec'
+    DECODE_ERRORS = (msgspec.DecodeError,)
+    _decode_summary = msgspec.json.Decoder(AssemblySummary).decode
+    _get_field = getattr
+elif orjson is not None:
+    JSON_DECODER = 'orjson'
+    # orjson.JSONDecodeError is a ValueError, like the type errors of
+    # _checked_summary
+    DECODE_ERRORS = (ValueError,)
+
+    def _decode_summary(line):
+        return _checked_summary(orjson.loads(line))
+
+    _get_field = dict.get
+else:
+    JSON_DECODER = 'json'
+    # json.JSONDecodeError and UnicodeDecodeError are ValueErrors too
+    DECODE_ERRORS = (ValueError,)
+
+    def _decode_summary(line):
+        return _checked_summary(json.loads(line))
+
+    _get_field = dict.get
+
+
+def decode_genome_summary(line):
+    """DECODED_COLUMNS of one JSON line, or None if it has no assembly info.
+
+    Uses msgspec when installed, else orjson, else the json module. Lines
+    whose GENOME_FIELDS do not have their declared types raise one of
+    DECODE_ERRORS with every decoder.
+    """
+    summary = _decode_summary(line)
+    if _get_field(summary, 'assembly_info') is None:
         return None
+    values = []
+    for part_name, fields in GENOME_FIELDS.items():
+        part = summary if part_name is None else _get_field(summary, part_name)
+        if part is None:
+            values.extend([None] * len(fields))
+        else:
+            values.extend([_get_field(part, field) for field, _ in fields.values()])
+    return values
 
 
-def process_genome_data(raw_data):
-    """Process and clean the genome data."""
-    if not raw_data:
-        return pd.DataFrame()
-        
-    # Extract relevant fields
-    processed_data = []
-    for entry in raw_data:
+def _release_key(release_date):
+    """Sort key putting the earliest release first and undated ones last."""
+    return (release_date is None, release_date or '')
+
+
+def earliest_per_taxon(lines, decode=decode_genome_summary):
+    """Reduce assembly summary lines to the earliest release per tax_id.
+
+    Lines are decoded one at a time straight into column lists that hold
+    only the current earliest assembly of each taxon, so memory grows with
+    the number of taxa rather than assemblies. Ties keep the entry seen
+    first. Lines that fail to decode, or whose fields do not have their
+    declared types, are logged and skipped.
+
+    Returns (lists of values by column, number of assembly entries seen).
+    """
+    columns = {column: [] for column in DECODED_COLUMNS}
+    release_dates = columns['assembly_release_date']
+    tax_id_field = DECODED_COLUMNS.index('organism_taxonomic_id')
+    release_date_field = DECODED_COLUMNS.index('assembly_release_date')
+    rows = {}
+    seen = 0
+    for line in lines:
         try:
-            # Get assembly info
-            assembly_info = entry.get('assembly_info', {})
-            assembly_stats = entry.get('assembly_stats', {})
-            organism_info = entry.get('organism', {})
-            checkm_info = entry.get('checkm_info', {})
-            
-            processed_entry = {
-                'assembly_accession': entry.get('accession'),
-                'assembly_name': assembly_info.get('assembly_name'),
-                'organism_name': organism_info.get('organism_name'),
-                'organism_taxonomic_id': organism_info.get('tax_id'),
-                'assembly_release_date': assembly_info.get('release_date'),
-                'assembly_release_year': (
-                    int(assembly_info.get('release_date').split('-')[0])
-                    if assembly_info.get('release_date') else None
-                ),
-                'checkm_completeness': checkm_info.get('completeness'),
-                'checkm_completeness_percentile': checkm_info.get('completeness_percentile'),
-                'checkm_contamination': checkm_info.get('contamination'),
-                'checkm_version': checkm_info.get('checkm_version'),
-                'checkm_marker_count': checkm_info.get('marker_count')
-            }
-            processed_data.append(processed_entry)
-        except Exception as e:
-            logging.warning(f"Error processing entry: {e}")
+            record = decode(line)
+        except DECODE_ERRORS as e:
+            logging.warning(f"Failed to parse JSON line: {e}")
             continue
-            
-    # Convert to DataFrame
-    df = pd.DataFrame(processed_data)
-    
-    # Sort by release year so we only keep the first occurrence
-    df = df.sort_values('assembly_release_year')
+        # Only process entries that have assembly info
+        if record is None:
+            continue
+        seen += 1
+        tax_id = record[tax_id_field]
+        row = rows.get(tax_id)
+        if row is None:
+            rows[tax_id] = len(release_dates)
+            for values, value in zip(columns.values(), record):
+                values.append(value)
+        elif _release_key(record[release_date_field]) < _release_key(release_dates[row]):
+            for values, value in zip(columns.values(), record):
+                values[row] = value
+    return columns, seen
+
+
+def query_genome_data(taxon_id, datasets_bin=DATASETS_BIN, released_after=None, cache=None):
+    """Query NCBI datasets for the earliest genome of each taxon.
+
+    Responses are read through cache, a ResponseCache, when given. Raises
+    RuntimeError if the datasets command fails.
+    """
+    cmd = genome_summary_command(taxon_id, datasets_bin, released_after)
+    logging.info(f"Running command: {' '.join(cmd)}")
     
-    # Remove duplicates
-    df_dedup = df.drop_duplicates(subset=['organism_taxonomic_id'])
-    logging.info(f"Removed {len(df) - len(df_dedup)} duplicate entries")
+    lines = stream_lines(cmd) if cache is None else cache.stream_lines(cmd)
+    columns, seen = earliest_per_taxon(lines)
+    kept = len(columns['assembly_accession'])
+
+    logging.info(f"Retrieved {seen} genome entries for taxon {taxon_id}")
+    logging.info(f"Removed {seen - kept} duplicate entries for taxon {taxon_id}")
+    return columns
+
+
+def query_with_retries(
+    taxon_id,
+    datasets_bin=DATASETS_BIN,
+    retries=RETRIES,
+    backoff=RETRY_BACKOFF,
+    released_after=None,
+    cache=None
+):
+    """query_genome_data, retried with exponential backoff on failure.
+
+    The error of the last attempt is raised if every attempt fails. A
+    missing executable or cached response is not retried.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return query_genome_data(taxon_id, datasets_bin, released_after, cache)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            logging.warning(
+                f"Query for taxon {taxon_id} failed (attempt {attempt + 1} of {retries + 1}): "
+                f"{e}. Retrying in {delay:g}s"
+            )
+            time.sleep(delay)
+
+
+def process_genome_data(columns):
+    """Turn the columns of the earliest genome per taxon into a DataFrame."""
+    df = pd.DataFrame(columns, columns=DECODED_COLUMNS)
+
+    # Release years from the leading digits of the release dates, all at once
+    release_dates = df['assembly_release_date'].astype('string')
+    df['assembly_release_year'] = pd.to_numeric(
+        release_dates.str.slice(0, 4), errors='coerce'
+    ).astype('Int64')
+
+    # Sort by release year, earliest first
+    df = df[GENOME_COLUMNS].sort_values('assembly_release_year', kind='stable')
     
     # Add collection timestamp
-    df_dedup['collection_date'] = date.today().strftime("%Y-%m-%d")
+    df['collection_date'] = date.today().strftime("%Y-%m-%d")
     
-    return df_dedup
+    return df
+
+
+def find_previous_snapshot(output_dir, taxon_name, before):
+    """Latest genome CSV of a taxon in a snapshot directory dated before `before`.
+
+    Snapshot directories are named YYYY_MM_DD. Returns None if there is none.
+    """
+    snapshots = [
+        path for path in Path(output_dir).glob(f"*/genome_data_{taxon_name}_*.csv")
+        if path.parent.name < before
+    ]
+    if not snapshots:
+        return None
+    return max(snapshots, key=lambda path: path.parent.name)
+
+
+def read_genome_snapshot(path):
+    """Read a saved genome CSV, keeping its values as they were written."""
+    return pd.read_csv(
+        path,
+        dtype={'organism_taxonomic_id': 'Int64', 'assembly_release_year': 'Int64'},
+        float_precision='round_trip'
+    )
+
+
+def merge_genome_snapshots(previous, new):
+    """Merge newly released genomes into a previous earliest-per-taxon table.
+
+    Returns (merged table, delta), where delta holds the rows of new that
+    became the earliest genome of their taxon. On equal release dates the
+    previous row is kept.
+    """
+    combined = pd.concat([previous, new], ignore_index=True)
+    # Earliest release per taxon; undated rows sort last
+    combined = combined.sort_values('assembly_release_date', kind='stable', na_position='last')
+    merged = combined.drop_duplicates(subset=['organism_taxonomic_id'], keep='first')
+    merged = merged.sort_index().sort_values('assembly_release_year', kind='stable')
+
+    delta = merged[merged.index >= len(previous)]
+    return merged, delta
+
+
+def write_csv(df, path):
+    """Write df as CSV through a temporary file, so readers never see a partial file."""
+    tmp_path = path.with_suffix('.csv.tmp')
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def read_release_years(file_path):
+    """Release years in a genome CSV, reading only that column.
+
+    Returns None if the file has no assembly_release_year column.
+    """
+    try:
+        years = pd.read_csv(file_path, usecols=['assembly_release_year'])['assembly_release_year']
+    except (pd.errors.EmptyDataError, ValueError):
+        return None
+    return pd.to_numeric(years, errors='coerce').dropna().to_numpy(dtype=np.int64)
+
+
+def cumulative_counts(output_dir):
+    """Cumulative genomes per year for each taxon in a snapshot directory.
+
+    Returns a frame indexed by year, from 1980 (or the earliest release
+    year) to the latest, with one column per taxon, or None if the
+    directory holds no genome data.
+    """
+    # Extract organism name from filename (e.g., genome_data_archaea_2025_01_26.csv -> archaea)
+    years = {}
+    for file_path in sorted(Path(output_dir).glob("genome_data_*.csv")):
+        organism_years = read_release_years(file_path)
+        if organism_years is not None:
+            years[file_path.stem.split('_')[2]] = organism_years
+    if not years:
+        return None
+
+    # Create year range from 1980 or earliest year to latest year
+    all_years = np.concatenate(list(years.values()))
+    start_year = min(all_years.min(), 1980) if len(all_years) else 1980
+    end_year = max(all_years.max(), start_year) if len(all_years) else start_year
+    n_years = end_year - start_year + 1
+
+    # Count genomes per year with one bincount per organism, then accumulate
+    return pd.DataFrame(
+        {
+            organism: np.cumsum(np.bincount(organism_years - start_year, minlength=n_years))
+            for organism, organism_years in years.items()
+        },
+        index=pd.RangeIndex(start_year, end_year + 1)
+    )
 
 
 def generate_cumulative_analysis(output_dir: str):
     """Generate cumulative analysis of genome sequencing over time."""
     logging.info(f"Generating cumulative analysis for {output_dir}")
     
-    # Get all genome data files in the directory
-    genome_files = list(Path(output_dir).glob("genome_data_*.csv"))
-    if not genome_files:
+    results = cumulative_counts(output_dir)
+    if results is None:
         logging.warning(f"No genome data files found in {output_dir}")
         return
-        
-    # Read and process each file
-    data_frames = {}
-    for file_path in genome_files:
-        # Extract organism name from filename (e.g., genome_data_archaea_2025_01_26.csv -> archaea)
-        organism = file_path.stem.split('_')[2]
-        df = pd.read_csv(file_path)
-        data_frames[organism] = df
-    
-    # Find the year range
-    min_year = float('inf')
-    max_year = 0
-    for df in data_frames.values():
-        if 'assembly_release_year' in df.columns:
-            years = pd.to_numeric(df['assembly_release_year'], errors='coerce')
-            min_year = min(min_year, years.min())
-            max_year = max(max_year, years.max())
-    
-    # Create year range from 1980 or earliest year to latest year
-    start_year = min(min_year, 1980)
-    year_range = range(int(start_year), int(max_year) + 1)
-    
-    # Initialize results DataFrame with years as index
-    results = pd.DataFrame(index=year_range)
-    
-    # Calculate cumulative counts for each organism
-    for organism, df in data_frames.items():
-        if 'assembly_release_year' in df.columns:
-            # Count genomes per year
-            yearly_counts = df['assembly_release_year'].value_counts()
-            # Convert to cumulative sum
-            cumulative = pd.Series(0, index=year_range)
-            for year in year_range:
-                if year in yearly_counts.index:
-                    cumulative[year] = yearly_counts[year]
-            results[organism] = cumulative.cumsum()
-    
-    # Sort index (years) and fill any missing values with previous value (or 0)
-    results = results.sort_index().fillna(method='ffill').fillna(0)
     
     # Save results
     results.to_csv(Path(output_dir) / 'results.csv')
@@ -199,21 +590,181 @@ def generate_cumulative_analysis(output_dir: str):
     return results
 
 
+def snapshot_dirs(output_dir):
+    """Snapshot directories (named YYYY_MM_DD) under output_dir, oldest first."""
+    return sorted(
+        path for path in Path(output_dir).iterdir()
+        if path.is_dir() and SNAPSHOT_DIR_PATTERN.fullmatch(path.name)
+    )
+
+
+def snapshot_signature(snapshot_dir):
+    """Hash of the names, sizes and modification times of a snapshot's genome CSVs."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(snapshot_dir).glob("genome_data_*.csv")):
+        stat = path.stat()
+        digest.update(f"{path.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def read_cumulative_history(history_path):
+    """Rows of a cumulative history file, empty if it is missing or empty."""
+    try:
+        history = pd.read_csv(history_path, dtype={'snapshot': str, 'signature': str})
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    if 'signature' not in history.columns:
+        # Written before signatures were kept: every snapshot is read again
+        history.insert(1, 'signature', None)
+    return history[HISTORY_COLUMNS]
+
+
+def generate_cumulative_history(output_dir: str, include_today: bool = False):
+    """Update the history file with the cumulative curves of new or changed snapshots.
+
+    The history (output_dir/cumulative_history.csv) has one row per
+    snapshot, taxon and year, with a signature of the snapshot's genome
+    CSVs (names, sizes and modification times). Only snapshots that are
+    not in it yet, or whose files changed since, are read, so each run
+    costs as much as the snapshots added or rewritten since the last one.
+    Today's snapshot may still be being written and is left out unless
+    include_today is set. The file is rewritten through a temporary file.
+    Returns the rows that were added or replaced.
+    """
+    history_path = Path(output_dir) / CUMULATIVE_HISTORY_FILE
+    history = read_cumulative_history(history_path)
+    recorded = dict(zip(history['snapshot'], history['signature']))
+    today = date.today().strftime("%Y_%m_%d")
+
+    updated = []
+    replaced = set()
+    for snapshot_dir in snapshot_dirs(output_dir):
+        if snapshot_dir.name == today and not include_today:
+            logging.info(f"Leaving out today's snapshot {snapshot_dir.name}")
+            continue
+        signature = snapshot_signature(snapshot_dir)
+        if recorded.get(snapshot_dir.name) == signature:
+            continue
+        results = cumulative_counts(snapshot_dir)
+        if results is None and snapshot_dir.name not in recorded:
+            continue
+        replaced.add(snapshot_dir.name)
+        if results is None:
+            logging.info(f"Removed cumulative analysis of snapshot {snapshot_dir.name}, it has no genome data")
+            continue
+        rows = results.rename_axis('year').reset_index().melt(
+            id_vars='year', var_name='taxon', value_name='genomes'
+        )
+        rows.insert(0, 'snapshot', snapshot_dir.name)
+        rows.insert(1, 'signature', signature)
+        updated.append(rows[HISTORY_COLUMNS])
+        action = 'Updated' if snapshot_dir.name in recorded else 'Added'
+        logging.info(f"{action} cumulative analysis of snapshot {snapshot_dir.name}")
+
+    if not replaced:
+        logging.info(f"No new or changed snapshots to add to {history_path}")
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    kept = history[~history['snapshot'].isin(replaced)]
+    frames = [frame for frame in [kept] + updated if len(frame)]
+    history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=HISTORY_COLUMNS)
+    write_csv(history.sort_values('snapshot', kind='stable'), history_path)
+
+    updated = pd.concat(updated, ignore_index=True) if updated else pd.DataFrame(columns=HISTORY_COLUMNS)
+    logging.info(f"Wrote {len(updated)} new or updated rows to {history_path}")
+    return updated
+
+
 def fetch_and_save_taxon_data(
     taxon_id: str,
     taxon_name: str,
-    output_dir: str
+    output_dir: str,
+    datasets_bin: str = DATASETS_BIN,
+    retries: int = RETRIES,
+    backoff: float = RETRY_BACKOFF,
+    incremental: bool = False,
+    cache: ResponseCache = None
 ):  
-    raw_data = query_genome_data(taxon_id)
-    df = process_genome_data(raw_data)
+    """Query one taxon and save its genomes, returning the output path.
+
+    Nothing is written if the query fails, so a failed taxon never leaves
+    an empty or partial CSV behind.
+
+    With incremental, only assemblies released on or after the latest
+    release date in the taxon's previous snapshot are queried and merged
+    into that snapshot. The genomes that changed are also written to a
+    genome_delta CSV. Without a previous snapshot, everything is queried.
+    """
     today = date.today().strftime("%Y_%m_%d")
+    previous = None
+    released_after = None
+    if incremental:
+        previous_path = find_previous_snapshot(output_dir, taxon_name, today)
+        if previous_path is not None:
+            previous = read_genome_snapshot(previous_path)
+            released_after = previous['assembly_release_date'].max()
+            if pd.isna(released_after):
+                previous, released_after = None, None
+            else:
+                logging.info(
+                    f"Refreshing {taxon_name} from {previous_path} with genomes "
+                    f"released on or after {released_after}"
+                )
+
+    columns = query_with_retries(taxon_id, datasets_bin, retries, backoff, released_after, cache)
+    df = process_genome_data(columns)
     
     # Create date-specific output directory
     date_output_dir = Path(output_dir) / today
     date_output_dir.mkdir(exist_ok=True)
+
+    if previous is not None:
+        df, delta = merge_genome_snapshots(previous, df)
+        delta_path = date_output_dir / f"genome_delta_{taxon_name}_{today}.csv"
+        write_csv(delta, delta_path)
+        logging.info(f"{len(delta)} new genomes for {taxon_name}, saved to {delta_path}")
     
     output_path = date_output_dir / f"genome_data_{taxon_name}_{today}.csv"
-    df.to_csv(output_path, index=False)
+    write_csv(df, output_path)
+    return output_path, len(df)
+
+
+def fetch_all_taxa(
+    taxa,
+    output_dir: str,
+    datasets_bin: str = DATASETS_BIN,
+    concurrency: int = CONCURRENCY,
+    retries: int = RETRIES,
+    backoff: float = RETRY_BACKOFF,
+    incremental: bool = False,
+    cache: ResponseCache = None
+):
+    """Fetch and save several taxa, running up to `concurrency` queries at once.
+
+    taxa maps taxon names to IDs. Each taxon is saved as soon as its query
+    completes, and a failing taxon does not stop the others. Returns the
+    errors of the taxa that failed, by name.
+    """
+    failures = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(
+                fetch_and_save_taxon_data, taxon_id, taxon_name, output_dir,
+                datasets_bin, retries, backoff, incremental, cache
+            ): taxon_name
+            for taxon_name, taxon_id in taxa.items()
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            taxon_name = futures[future]
+            try:
+                output_path, n_genomes = future.result()
+                logging.info(
+                    f"[{done}/{len(futures)}] Saved {n_genomes} genomes for {taxon_name} to {output_path}"
+                )
+            except Exception as e:
+                failures[taxon_name] = e
+                logging.error(f"[{done}/{len(futures)}] Failed to fetch {taxon_name}: {e}")
+    return failures
 
 
 def main():
@@ -226,9 +777,37 @@ def main():
                       help='Directory for output files')
     parser.add_argument('--cumulative-analysis', action='store_true',
                       help='Generate cumulative analysis of genome sequencing over time')
+    parser.add_argument('--all-snapshots', action='store_true',
+                      help='Add the cumulative analysis of every snapshot that is new or changed since it was '
+                           'added to cumulative_history.csv')
+    parser.add_argument('--include-today', action='store_true',
+                      help="With --all-snapshots, also add today's snapshot")
+    parser.add_argument('--incremental', action='store_true',
+                      help='Only query genomes released since the previous snapshot and merge them into it')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                      help='Number of taxa to query at the same time')
+    parser.add_argument('--retries', type=int, default=RETRIES,
+                      help='Times to retry a failed taxon query')
+    parser.add_argument('--retry-backoff', type=float, default=RETRY_BACKOFF,
+                      help='Seconds to wait before the first retry, doubled for each further retry')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                      help='Cache datasets responses in this directory and replay them for --cache-ttl hours '
+                           '(default: no caching, always query NCBI)')
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL / 3600,
+                      help='Hours a cached response is replayed instead of querying NCBI again')
+    parser.add_argument('--offline', action='store_true',
+                      help=f'Only replay cached responses (from --cache-dir, default {CACHE_DIR}), never query NCBI')
+    parser.add_argument('--record-fixtures', type=str, default=None,
+                      help='Also store every response, live or replayed, in this directory as fixtures that never expire')
+    parser.add_argument('--datasets-bin', type=str, default=DATASETS_BIN,
+                      help='Path to the NCBI datasets executable (default: $DATASETS_BIN or datasets)')
     
     args = parser.parse_args()
 
+    if args.all_snapshots:
+        generate_cumulative_history(args.output_dir, args.include_today)
+        return
+
     today = date.today().strftime("%Y_%m_%d")
     date_output_dir = Path(args.output_dir) / today
     date_output_dir.mkdir(exist_ok=True)
@@ -239,21 +818,34 @@ def main():
 
     # Setup
     setup_directories()
-    if not check_datasets_installation():
+    if not args.offline and not check_datasets_installation(args.datasets_bin):
         return
+    # Responses are only replayed when a cache is asked for, so a normal run
+    # always saves what NCBI returns today
+    cache_dir = args.cache_dir
+    if cache_dir is None and args.offline:
+        cache_dir = CACHE_DIR
+    cache = ResponseCache(cache_dir, args.cache_ttl * 3600, args.offline, args.record_fixtures)
         
     # Query and process data
     if args.taxon_id:
         logging.info(f"Querying genome data for taxon {args.taxon_id}")
-        fetch_and_save_taxon_data(args.taxon_id, TAXON_ID_MAP[args.taxon_name], args.output_dir)
+        taxa = {args.taxon_name or str(args.taxon_id): args.taxon_id}
     else:
         logging.info(f"Querying genome data for all taxons")
-        for taxon_name, taxon_id in TAXON_ID_MAP.items():
-            fetch_and_save_taxon_data(taxon_id, taxon_name, args.output_dir)
+        taxa = TAXON_ID_MAP
+    failures = fetch_all_taxa(
+        taxa, args.output_dir, args.datasets_bin,
+        args.concurrency, args.retries, args.retry_backoff, args.incremental, cache
+    )
     
     # Generate cumulative analysis
     generate_cumulative_analysis(date_output_dir)
 
+    if failures:
+        logging.error(f"Failed to fetch {len(failures)} of {len(taxa)} taxa: {', '.join(failures)}")
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
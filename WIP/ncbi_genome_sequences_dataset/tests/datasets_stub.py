@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Stand-in for the NCBI datasets executable, for tests.
+
+Answers `datasets --version` and `datasets summary genome ...` by
+printing the assembly summaries in fixtures/genome_summaries.jsonl,
+keeping only those released on or after --released-after when given.
+Like the real CLI, --released-after takes MM/DD/YYYY; any other form is
+an error. Lines that are not valid JSON are printed as they are.
+"""
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'genome_summaries.jsonl'
+
+
+def main(args):
+    if args == ['--version']:
+        print('datasets version: stub')
+        return 0
+    if args[:2] != ['summary', 'genome']:
+        print(f"Unsupported command: {' '.join(args)}", file=sys.stderr)
+        return 1
+    released_after = None
+    if '--released-after' in args:
+        value = args[args.index('--released-after') + 1]
+        try:
+            released_after = datetime.strptime(value, '%m/%d/%Y').date().isoformat()
+        except ValueError:
+            print(f"Invalid --released-after date {value!r}, expected MM/DD/YYYY", file=sys.stderr)
+            return 1
+    with open(FIXTURE, 'rb') as f:
+        for line in f:
+            try:
+                release_date = json.loads(line)['assembly_info'].get('release_date')
+            except (ValueError, KeyError):
+                sys.stdout.buffer.write(line)
+                continue
+            if released_after is None or (release_date is not None and release_date >= released_after):
+                sys.stdout.buffer.write(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
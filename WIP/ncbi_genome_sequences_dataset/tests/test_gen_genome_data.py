@@ -0,0 +1,192 @@
+"""Smoke tests for gen_genome_data.py, using datasets_stub.py instead of NCBI.
+
+Run with: python -m pytest WIP/ncbi_genome_sequences_dataset/tests
+"""
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).parent
+SCRIPT = HERE.parent / 'gen_genome_data.py'
+DATASETS_STUB = str(HERE / 'datasets_stub.py')
+SUMMARIES = HERE / 'fixtures' / 'genome_summaries.jsonl'
+# Responses of datasets_stub.py recorded with --record-fixtures
+RECORDED_RESPONSES = HERE / 'fixtures' / 'responses'
+
+
+# JSON decoders gen_genome_data picks from, fastest first
+DECODERS = ['msgspec', 'orjson', 'json']
+# Lines with an assembly info whose fields do not have their declared types
+MISTYPED_LINES = [
+    b'{"accession": "GCF_000000061.1", "assembly_info": {"release_date": "2001-01-01"}, "organism": {"tax_id": "500"}}\n',
+    b'{"accession": "GCF_000000062.1", "assembly_info": {"release_date": "2001-01-01"}, "organism": {"tax_id": 500}, '
+    b'"checkm_info": {"marker_count": 1.5}}\n',
+    b'{"accession": "GCF_000000063.1", "assembly_info": {"release_date": "2001-01-01"}, "organism": {"tax_id": 500}, '
+    b'"checkm_info": []}\n',
+    b'{"accession": 64, "assembly_info": {"release_date": "2001-01-01"}, "organism": {"tax_id": 500}}\n',
+    b'{"accession": "GCF_000000065.1", "assembly_info": {"release_date": 2001}, "organism": {"tax_id": 500}}\n',
+    b'{"accession": "GCF_000000066.1", "assembly_info": {"release_date": "2001-01-01"}, "organism": {"tax_id": true}}\n',
+    b'["GCF_000000067.1"]\n'
+]
+
+
+def load_script(directory, hidden=()):
+    """Import gen_genome_data with its log file in directory, as if the
+    modules in hidden were not installed."""
+    cwd = os.getcwd()
+    saved = {name: sys.modules.pop(name, None) for name in hidden}
+    os.chdir(directory)
+    try:
+        Path('logs').mkdir(exist_ok=True)
+        sys.modules.update(dict.fromkeys(hidden))
+        spec = importlib.util.spec_from_file_location('gen_genome_data', SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+        for name, saved_module in saved.items():
+            if saved_module is None:
+                del sys.modules[name]
+            else:
+                sys.modules[name] = saved_module
+    return module
+
+
+@pytest.fixture(scope='module')
+def gen(tmp_path_factory):
+    """gen_genome_data, imported with its log file in a temporary directory."""
+    return load_script(tmp_path_factory.mktemp('run'))
+
+
+@pytest.fixture(scope='module', params=DECODERS)
+def decoding_gen(request, tmp_path_factory):
+    """gen_genome_data using each installed JSON decoder in turn."""
+    module = load_script(
+        tmp_path_factory.mktemp('run'), hidden=DECODERS[:DECODERS.index(request.param)]
+    )
+    if module.JSON_DECODER != request.param:
+        pytest.skip(f"{request.param} is not installed")
+    return module
+
+
+def summary_lines():
+    with open(SUMMARIES, 'rb') as f:
+        return f.readlines()
+
+
+def test_stub_is_found(gen):
+    assert gen.check_datasets_installation(DATASETS_STUB)
+
+
+def test_genome_summary_command(gen):
+    assert gen.genome_summary_command(2, 'datasets') == [
+        'datasets', 'summary', 'genome', 'taxon', '2',
+        '--assembly-level', 'chromosome,complete', '--as-json-lines'
+    ]
+    # Release dates are ISO in the summaries but MM/DD/YYYY for the CLI
+    assert gen.genome_summary_command(2, 'datasets', released_after='2018-01-09') == [
+        'datasets', 'summary', 'genome', 'taxon', '2',
+        '--assembly-level', 'chromosome,complete', '--as-json-lines',
+        '--released-after', '01/09/2018'
+    ]
+
+
+def test_earliest_per_taxon(gen):
+    columns, seen = gen.earliest_per_taxon(summary_lines())
+
+    # The line without assembly info and the truncated line are skipped
+    assert seen == 7
+    assert set(columns) == set(gen.DECODED_COLUMNS)
+    # Earlier release replaces a later one, ties keep the first entry and
+    # undated entries lose to dated ones
+    assert columns['assembly_accession'] == [
+        'GCF_000000012.1', 'GCF_000000021.1', 'GCF_000000032.1', 'GCF_000000042.1'
+    ]
+    assert columns['organism_taxonomic_id'] == [100, 200, 300, 400]
+    assert columns['checkm_completeness'][0] == 98.0
+    assert columns['checkm_version'][3] is None
+
+
+def test_mistyped_lines_are_skipped(decoding_gen):
+    # An integer is still a valid completeness, as a float
+    lines = summary_lines() + MISTYPED_LINES + [
+        b'{"accession": "GCF_000000068.1", "assembly_info": {"release_date": "2002-01-01"}, '
+        b'"organism": {"tax_id": 500}, "checkm_info": {"completeness": 97}}\n'
+    ]
+    columns, seen = decoding_gen.earliest_per_taxon(lines)
+
+    assert seen == 8
+    assert columns['assembly_accession'] == [
+        'GCF_000000012.1', 'GCF_000000021.1', 'GCF_000000032.1', 'GCF_000000042.1', 'GCF_000000068.1'
+    ]
+    assert columns['organism_taxonomic_id'] == [100, 200, 300, 400, 500]
+    assert columns['checkm_completeness'] == [98.0, 97.2, 95.0, None, 97.0]
+    assert type(columns['checkm_completeness'][4]) is float
+
+
+def test_merge_genome_snapshots(gen, tmp_path):
+    lines = summary_lines()
+    previous, _ = gen.earliest_per_taxon(lines[:4])
+    previous_path = tmp_path / 'previous.csv'
+    gen.write_csv(gen.process_genome_data(previous), previous_path)
+    previous = gen.read_genome_snapshot(previous_path)
+    new, _ = gen.earliest_per_taxon(lines[2:])
+    new = gen.process_genome_data(new)
+
+    merged, delta = gen.merge_genome_snapshots(previous, new)
+
+    assert merged['assembly_accession'].tolist() == [
+        'GCF_000000012.1', 'GCF_000000021.1', 'GCF_000000032.1', 'GCF_000000042.1'
+    ]
+    assert merged['assembly_release_year'].tolist() == [2005, 2018, 2021, 2023]
+    assert delta['assembly_accession'].tolist() == ['GCF_000000032.1', 'GCF_000000042.1']
+
+
+def test_incremental_fetch(gen, tmp_path):
+    output_dir = tmp_path / 'output'
+    previous_dir = output_dir / '2000_01_01'
+    previous_dir.mkdir(parents=True)
+    previous, _ = gen.earliest_per_taxon(summary_lines()[:4])
+    gen.write_csv(gen.process_genome_data(previous), previous_dir / 'genome_data_examplea_2000_01_01.csv')
+
+    output_path, n_genomes = gen.fetch_and_save_taxon_data(
+        2, 'examplea', output_dir, DATASETS_STUB, retries=0, incremental=True
+    )
+
+    assert n_genomes == 4
+    delta_path = output_path.with_name(output_path.name.replace('genome_data', 'genome_delta'))
+    delta = gen.read_genome_snapshot(delta_path)
+    assert delta['assembly_accession'].tolist() == ['GCF_000000032.1', 'GCF_000000042.1']
+
+
+def test_offline_replay(gen, tmp_path):
+    record_dir = tmp_path / 'fixtures'
+    recording = gen.ResponseCache(cache_dir=None, record_dir=record_dir)
+    live = gen.query_genome_data(2, DATASETS_STUB, cache=recording)
+    assert len(list(record_dir.glob('*.jsonl.gz'))) == 1
+    assert len(list(record_dir.glob('*.json'))) == 1
+
+    # The cache key ignores the executable, so no datasets is needed offline
+    replay = gen.ResponseCache(cache_dir=record_dir, offline=True)
+    assert gen.query_genome_data(2, 'missing-datasets', cache=replay) == live
+
+    with pytest.raises(FileNotFoundError):
+        gen.query_genome_data(2, 'missing-datasets', released_after='2020-01-01', cache=replay)
+
+
+def test_replay_recorded_fixtures(gen, tmp_path):
+    # Recorded fixtures are replayed offline however old they are
+    replay = gen.ResponseCache(cache_dir=RECORDED_RESPONSES, offline=True)
+    output_path, n_genomes = gen.fetch_and_save_taxon_data(
+        2, 'bacteria', tmp_path, 'missing-datasets', retries=0, cache=replay
+    )
+
+    assert n_genomes == 4
+    saved = gen.read_genome_snapshot(output_path)
+    assert saved['assembly_accession'].tolist() == [
+        'GCF_000000012.1', 'GCF_000000021.1', 'GCF_000000032.1', 'GCF_000000042.1'
+    ]
+    assert saved['assembly_release_year'].tolist() == [2005, 2018, 2021, 2023]
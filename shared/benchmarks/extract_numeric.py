@@ -0,0 +1,58 @@
+"""Time extract_numeric_columns against extract_numeric_value per row.
+
+Run from the repository root:
+
+    python -m shared.benchmarks.extract_numeric [--rows N] [--repeat N]
+
+Values are generated from a fixed seed and mostly distinct, so the
+column version gets little help from parsing each distinct value once.
+The best of --repeat runs is reported for each.
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from shared.util import extract_numeric_columns, extract_numeric_value
+
+
+def generate_values(rows, seed=0):
+    """Mostly distinct value strings: numbers, ranges, notes, URLs and gaps"""
+    rng = random.Random(seed)
+    makers = [
+        lambda: f"{rng.random() * 100:.2f}",
+        lambda: f"{rng.randint(1, 99)}-{rng.randint(100, 999)}",
+        lambda: f"~{rng.random():.3f} (BNID {rng.randint(1, 10 ** 6)})",
+        lambda: None,
+        lambda: f"see http://x.org/{rng.randint(1, 10 ** 6)}-b.pdf {rng.randint(1, 9)} to {rng.randint(10, 99)}"
+    ]
+    return pd.Series([rng.choice(makers)() for _ in range(rows)], dtype='string')
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300000, help='Values to parse')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs to take the best of')
+    args = parser.parse_args()
+
+    values = generate_values(args.rows)
+    print(f"{args.rows} values, {values.nunique()} distinct")
+    per_row = best_time(lambda: values.apply(extract_numeric_value), args.repeat)
+    column = best_time(lambda: extract_numeric_columns(values), args.repeat)
+    print(f"extract_numeric_value per row: {per_row:.3f}s")
+    print(f"extract_numeric_columns:       {column:.3f}s")
+    print(f"Speedup: {per_row / column:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
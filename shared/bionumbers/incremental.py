@@ -0,0 +1,187 @@
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from shared.bionumbers.parse import (
+    clean_size_data,
+    SIZE_DATA_COLUMNS,
+    SCALE_CATEGORIES
+)
+from shared.bionumbers.schema import FLOAT_COLUMNS
+
+
+# Raw fields clean_size_data reads; a row is reprocessed when any of them
+# changes. Bump FINGERPRINT_VERSION when the processing itself changes so
+# earlier outputs are not reused.
+FINGERPRINT_FIELDS = ['bion_id', 'Properties', 'Organism', 'Value', 'Range', 'Units']
+FINGERPRINT_VERSION = 1
+
+# clean_size_data options that do not change its output
+EXECUTION_OPTIONS = ['debug_units', 'workers', 'shard_size']
+
+
+def _row_hashes(df):
+    fields = df[FINGERPRINT_FIELDS].astype('string')
+    hashes = pd.util.hash_pandas_object(fields, index=False)
+    hashes.index = fields['bion_id'].to_numpy()
+    return hashes
+
+
+def _combine_duplicates(hashes):
+    duplicated = hashes.index.duplicated(keep=False)
+    if not duplicated.any():
+        return hashes
+    combined = hashes[duplicated].groupby(level=0).agg(
+        lambda h: int.from_bytes(
+            hashlib.sha256(np.sort(h.to_numpy()).tobytes()).digest()[:8], 'little'
+        )
+    ).astype('uint64')
+    return pd.concat([hashes[~duplicated], combined])
+
+
+def row_fingerprints(df):
+    """Hash of the FINGERPRINT_FIELDS of each raw row, keyed by bion_id
+
+    Rows sharing a bion_id are combined into a single fingerprint.
+    """
+    return _combine_duplicates(_row_hashes(df))
+
+
+class RowFingerprints:
+    """row_fingerprints of raw data read as record batches
+
+    Pass the batches through track() on their way to be cleaned; once they
+    are consumed, result() equals row_fingerprints of their concatenation
+    and source_hash is the batches' attrs['source_hash'].
+    """
+
+    def __init__(self):
+        self.source_hash = None
+        self._hashes = []
+
+    def track(self, batches):
+        """Yield batches unchanged, hashing the rows of each one"""
+        for batch in batches:
+            self._hashes.append(_row_hashes(batch))
+            self.source_hash = batch.attrs.get('source_hash', self.source_hash)
+            yield batch
+
+    def result(self):
+        """Fingerprints of every row seen so far, keyed by bion_id"""
+        return _combine_duplicates(pd.concat(self._hashes))
+
+
+def config_fingerprint(**clean_kwargs):
+    """Hash of the clean_size_data settings an output was produced with"""
+    settings = {
+        key: clean_kwargs[key] for key in sorted(clean_kwargs)
+        if key not in EXECUTION_OPTIONS
+    }
+    settings['version'] = FINGERPRINT_VERSION
+    return hashlib.sha256(json.dumps(settings).encode()).hexdigest()
+
+
+def fingerprint_path(output_path):
+    """Sidecar file holding the raw row fingerprints of a processed output"""
+    directory, name = os.path.split(output_path)
+    return os.path.join(directory, f"fingerprints_{os.path.splitext(name)[0]}.json")
+
+
+def save_fingerprints(output_path, fingerprints, config):
+    """Write the fingerprints behind a processed output next to it"""
+    with open(fingerprint_path(output_path), 'w') as f:
+        json.dump({
+            'config': config,
+            'rows': {str(k): str(v) for k, v in fingerprints.items()}
+        }, f)
+
+
+def load_fingerprints(output_path):
+    """Read the fingerprints saved by save_fingerprints, or None"""
+    path = fingerprint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        saved = json.load(f)
+    rows = pd.Series(
+        np.array([int(v) for v in saved['rows'].values()], dtype='uint64'),
+        index=list(saved['rows'].keys())
+    )
+    return saved['config'], rows
+
+
+def find_previous_output(output_dir, product):
+    """Latest {product}_*.csv in output_dir that has saved fingerprints"""
+    outputs = sorted(glob.glob(os.path.join(output_dir, f"{product}_*.csv")))
+    for path in reversed(outputs):
+        if os.path.exists(fingerprint_path(path)):
+            return path
+    return None
+
+
+def read_previous_output(output_path):
+    """Reload a processed output CSV without reformatting its values"""
+    # Everything but the measurements is kept as text so reused rows are
+    # written back unchanged
+    dtypes = {column: 'string' for column in SIZE_DATA_COLUMNS}
+    dtypes.update({column: float for column in FLOAT_COLUMNS})
+    # round_trip so floats read back exactly as they were written
+    previous = pd.read_csv(output_path, dtype=dtypes, float_precision='round_trip')
+    previous['category'] = pd.Categorical(previous['category'], categories=SCALE_CATEGORIES)
+    return previous
+
+
+def incremental_clean_size_data(df, output_dir, product, **clean_kwargs):
+    """clean_size_data that only reprocesses rows changed since the last run
+
+    Raw rows are fingerprinted by bion_id and compared with the fingerprints
+    saved next to the latest output of product in output_dir. Rows that are
+    new or changed go through clean_size_data; processed rows of unchanged
+    ids are reused from the previous output. Without a usable previous
+    output (none found, or produced with different settings) every row is
+    processed.
+
+    Returns (size_data, fingerprints, changes), where changes lists the
+    added, changed and removed bion_ids and the previous output used.
+    """
+    fingerprints = row_fingerprints(df)
+    config = config_fingerprint(**clean_kwargs)
+
+    previous_path = find_previous_output(output_dir, product)
+    saved = load_fingerprints(previous_path) if previous_path else None
+    if saved is None or saved[0] != config:
+        previous_path = None
+        previous_rows = pd.Series(dtype='uint64')
+    else:
+        previous_rows = saved[1]
+
+    common = fingerprints.index.intersection(previous_rows.index)
+    differs = fingerprints[common].to_numpy() != previous_rows[common].to_numpy()
+    changes = {
+        'previous_output': previous_path,
+        'added': sorted(fingerprints.index.difference(previous_rows.index)),
+        'changed': sorted(common[differs]),
+        'removed': sorted(previous_rows.index.difference(fingerprints.index))
+    }
+
+    ids = df['bion_id'].astype('string')
+    dirty = ids.isin(changes['added'] + changes['changed']).to_numpy()
+    processed = clean_size_data(df[dirty], **clean_kwargs)
+
+    if previous_path is None:
+        return processed, fingerprints, changes
+
+    unchanged = common[~differs]
+    previous = read_previous_output(previous_path)
+    reused = previous[previous['bion_id'].isin(unchanged)]
+    size_data = pd.concat([reused, processed], ignore_index=True)[SIZE_DATA_COLUMNS]
+
+    # Put rows back in raw export order so the result matches a full run
+    raw_order = pd.Series(np.arange(len(ids)), index=ids.to_numpy())
+    raw_order = raw_order[~raw_order.index.duplicated()]
+    position = raw_order.reindex(size_data['bion_id'].astype(str)).to_numpy()
+    size_data = size_data.iloc[np.argsort(position, kind='stable')]
+    return size_data.reset_index(drop=True), fingerprints, changes
@@ -0,0 +1,278 @@
+import os
+
+import numpy as np
+import pandas as pd
+from shared.catalog import output_content_hash
+
+
+INTERVAL_INDEX_VERSION = 1
+
+# Subtrees of at most 2**(LINEAR_SCAN_LEVEL + 1) intervals are scanned
+# linearly instead of descended
+LINEAR_SCAN_LEVEL = 3
+
+
+class IntervalTree:
+    """Static interval tree over closed intervals, in cgranges layout
+
+    Intervals are sorted by start and stored in plain arrays that double as
+    an implicit balanced binary tree: the node at index i has level equal
+    to the number of trailing 1 bits of i, and max_end[i] is the largest
+    end in its subtree. Nothing but the three arrays and the row each
+    interval came from needs to be stored.
+    """
+
+    def __init__(self, starts, ends, rows, max_end=None):
+        order = np.argsort(starts, kind='stable') if max_end is None else slice(None)
+        self.starts = np.asarray(starts, dtype=float)[order]
+        self.ends = np.asarray(ends, dtype=float)[order]
+        self.rows = np.asarray(rows, dtype=np.int64)[order]
+        self.max_end = self._augment() if max_end is None else np.asarray(max_end, dtype=float)
+        self.max_level = self._max_level(len(self.starts))
+
+    @staticmethod
+    def _max_level(n):
+        level = 0
+        while (1 << (level + 1)) <= n:
+            level += 1
+        return level
+
+    def _augment(self):
+        n = len(self.starts)
+        max_end = self.ends.copy()
+        if n == 0:
+            return max_end
+        last_i = (n - 1) & ~1
+        last = max_end[last_i]
+        k = 1
+        while (1 << k) <= n:
+            x = 1 << (k - 1)
+            i0 = (x << 1) - 1
+            step = x << 2
+            for i in range(i0, n, step):
+                right = max_end[i + x] if i + x < n else last
+                max_end[i] = max(self.ends[i], max_end[i - x], right)
+            last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+            if last_i < n and max_end[last_i] > last:
+                last = max_end[last_i]
+            k += 1
+        return max_end
+
+    def overlapping(self, lo, hi):
+        """Rows of the intervals overlapping [lo, hi], in order of start"""
+        n = len(self.starts)
+        found = []
+        stack = [(self.max_level, (1 << self.max_level) - 1, False)] if n else []
+        while stack:
+            level, i, visited = stack.pop()
+            if level <= LINEAR_SCAN_LEVEL:
+                i0 = i >> level << level
+                i1 = min(i0 + (1 << (level + 1)) - 1, n)
+                stop = i0 + np.searchsorted(self.starts[i0:i1], hi, side='right')
+                hits = np.flatnonzero(self.ends[i0:stop] >= lo)
+                found.append(hits + i0)
+            elif not visited:
+                stack.append((level, i, True))
+                left = i - (1 << (level - 1))
+                if left >= n or self.max_end[left] >= lo:
+                    stack.append((level - 1, left, False))
+            elif i < n and self.starts[i] <= hi:
+                if self.ends[i] >= lo:
+                    found.append(np.array([i]))
+                stack.append((level - 1, i + (1 << (level - 1)), False))
+        if not found:
+            return np.array([], dtype=np.int64)
+        return self.rows[np.sort(np.concatenate(found))]
+
+    def within(self, lo, hi):
+        """Rows of the intervals contained in [lo, hi], in order of start"""
+        first = np.searchsorted(self.starts, lo, side='left')
+        last = np.searchsorted(self.starts, hi, side='right')
+        candidates = np.arange(first, last)
+        return self.rows[candidates[self.ends[candidates] <= hi]]
+
+
+class SizeIntervalIndex:
+    """Range index over the standardized columns of a processed frame
+
+    Rows are partitioned by standardized_dimension. Each partition holds
+    the point values (standardized_value) as a sorted array and the ranges
+    (standardized_min to standardized_max) as an IntervalTree. Query
+    results are row positions into the frame the index was built from.
+    Each row also gets a representative value (its point value, else the
+    geometric midpoint of its range) for log-scale histograms. A saved
+    index keeps the content hash of the output it was built for.
+    """
+
+    def __init__(self, n_rows, categories, category_codes, partitions, source_hash=None):
+        self.n_rows = n_rows
+        self.categories = list(categories)
+        self.category_codes = category_codes
+        self.partitions = partitions
+        self.source_hash = source_hash
+
+    @classmethod
+    def from_frame(cls, df):
+        category = pd.Categorical(df['category'])
+        dimension_codes, dimensions = pd.factorize(df['standardized_dimension'])
+        value = df['standardized_value'].to_numpy(dtype=float)
+        low = df['standardized_min'].to_numpy(dtype=float)
+        high = df['standardized_max'].to_numpy(dtype=float)
+
+        has_range = ~np.isnan(low) & ~np.isnan(high)
+        with np.errstate(invalid='ignore'):
+            midpoint = np.where(
+                (low > 0) & (high > 0), np.sqrt(low * high), (low + high) / 2
+            )
+        representative = np.where(~np.isnan(value), value, np.where(has_range, midpoint, np.nan))
+
+        partitions = {}
+        for code, dimension in enumerate(dimensions):
+            rows = np.flatnonzero(dimension_codes == code)
+            points = rows[~np.isnan(value[rows])]
+            order = np.argsort(value[points], kind='stable')
+            ranges = rows[has_range[rows]]
+            partitions[dimension] = {
+                'point_values': value[points][order],
+                'point_rows': points[order],
+                'ranges': IntervalTree(low[ranges], high[ranges], ranges),
+                'representative': representative[rows],
+                'representative_rows': rows
+            }
+        return cls(len(df), category.categories, category.codes, partitions)
+
+    def _partition(self, dimension):
+        if dimension not in self.partitions:
+            raise KeyError(f"No rows with dimension {dimension!r} in the index")
+        return self.partitions[dimension]
+
+    def points_between(self, dimension, lo, hi):
+        """Rows whose point value lies in [lo, hi], in order of value"""
+        partition = self._partition(dimension)
+        first = np.searchsorted(partition['point_values'], lo, side='left')
+        last = np.searchsorted(partition['point_values'], hi, side='right')
+        return partition['point_rows'][first:last]
+
+    def ranges_overlapping(self, dimension, lo, hi):
+        """Rows whose range intersects [lo, hi]"""
+        return self._partition(dimension)['ranges'].overlapping(lo, hi)
+
+    def ranges_within(self, dimension, lo, hi):
+        """Rows whose range lies entirely inside [lo, hi]"""
+        return self._partition(dimension)['ranges'].within(lo, hi)
+
+    def overlapping(self, dimension, lo, hi):
+        """Rows whose point value or range intersects [lo, hi], in row order"""
+        return np.union1d(
+            self.points_between(dimension, lo, hi),
+            self.ranges_overlapping(dimension, lo, hi)
+        )
+
+    def log_histogram(self, dimension, bins_per_decade=1):
+        """Counts per category of representative values in log10 bins
+
+        Returns a frame indexed by the lower edge of each bin (as a power
+        of ten) with one column per category. Non-positive values have no
+        logarithm and are left out.
+        """
+        partition = self._partition(dimension)
+        values = partition['representative']
+        codes = self.category_codes[partition['representative_rows']]
+        keep = (values > 0) & (codes >= 0)
+        logs = np.log10(values[keep])
+        codes = codes[keep]
+        if not len(logs):
+            return pd.DataFrame(columns=self.categories, dtype='int64')
+
+        low = np.floor(logs.min() * bins_per_decade) / bins_per_decade
+        high = np.floor(logs.max() * bins_per_decade) / bins_per_decade
+        edges = np.arange(low, high + 2 / bins_per_decade, 1 / bins_per_decade)
+        bins = np.clip(np.searchsorted(edges, logs, side='right') - 1, 0, len(edges) - 2)
+
+        # One 2-D bincount over (bin, category) pairs
+        n_categories = len(self.categories)
+        counts = np.bincount(
+            bins * n_categories + codes, minlength=(len(edges) - 1) * n_categories
+        ).reshape(len(edges) - 1, n_categories)
+        histogram = pd.DataFrame(
+            counts, index=pd.Index(np.round(edges[:-1], 6), name='log10_lower'),
+            columns=self.categories
+        )
+        return histogram.loc[:, histogram.sum() > 0]
+
+    def save(self, path, source_hash=None):
+        """Persist the index as a single .npz file
+
+        source_hash is the content hash of the output the index is saved
+        with, checked by load_interval_index before the index is reused.
+        """
+        if source_hash is not None:
+            self.source_hash = source_hash
+        arrays = {
+            'version': np.array(INTERVAL_INDEX_VERSION),
+            'n_rows': np.array(self.n_rows),
+            'source_hash': np.array(self.source_hash or '', dtype=str),
+            'categories': np.array(self.categories, dtype=str),
+            'category_codes': self.category_codes,
+            'dimensions': np.array(list(self.partitions), dtype=str)
+        }
+        for i, partition in enumerate(self.partitions.values()):
+            tree = partition['ranges']
+            arrays.update({
+                f"p{i}_point_values": partition['point_values'],
+                f"p{i}_point_rows": partition['point_rows'],
+                f"p{i}_range_starts": tree.starts,
+                f"p{i}_range_ends": tree.ends,
+                f"p{i}_range_max_end": tree.max_end,
+                f"p{i}_range_rows": tree.rows,
+                f"p{i}_representative": partition['representative'],
+                f"p{i}_representative_rows": partition['representative_rows']
+            })
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != INTERVAL_INDEX_VERSION:
+                raise ValueError(f"{path} was written by another interval index version")
+            partitions = {}
+            for i, dimension in enumerate(data['dimensions']):
+                partitions[str(dimension)] = {
+                    'point_values': data[f"p{i}_point_values"],
+                    'point_rows': data[f"p{i}_point_rows"],
+                    'ranges': IntervalTree(
+                        data[f"p{i}_range_starts"], data[f"p{i}_range_ends"],
+                        data[f"p{i}_range_rows"], max_end=data[f"p{i}_range_max_end"]
+                    ),
+                    'representative': data[f"p{i}_representative"],
+                    'representative_rows': data[f"p{i}_representative_rows"]
+                }
+            source_hash = str(data['source_hash']) if 'source_hash' in data else ''
+            return cls(
+                int(data['n_rows']), [str(c) for c in data['categories']],
+                data['category_codes'], partitions, source_hash or None
+            )
+
+
+def interval_index_path(output_path):
+    """Index file stored next to a processed output"""
+    return f"{os.path.splitext(output_path)[0]}.intervals.npz"
+
+
+def load_interval_index(output_path, df=None):
+    """Index saved next to output_path, built from df if there is none
+
+    A saved index is only used if it was saved with the output's current
+    content hash, so an index left over from another output is never
+    reused. df must then hold the output's rows in file order.
+    """
+    path = interval_index_path(output_path)
+    if os.path.exists(path):
+        index = SizeIntervalIndex.load(path)
+        if index.source_hash == output_content_hash(output_path):
+            return index
+        if df is None:
+            raise ValueError(f"{path} was built from a different version of {output_path}")
+    elif df is None:
+        raise FileNotFoundError(f"No interval index at {path}")
+    return SizeIntervalIndex.from_frame(df)
@@ -1,16 +1,56 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
 import pandas as pd
-from shared.util import (
-    load_bionumbers_data,
-    extract_numeric_value,
-    standardize_units
-)
+from shared.distinct import map_distinct, take_distinct
+from shared.util import extract_numeric_columns
+from shared.units import lookup_units
+from shared.keyword_matcher import compile_keyword_filter
+
+
+# Upper bound on distinct Properties strings remembered by parse_property
+PARSE_PROPERTY_CACHE_SIZE = 65536
+
+# Rows per shard when clean_size_data runs on several worker processes
+SHARD_SIZE = 50000
 
 
 def parse_property(prop_str):
     """Parse property string into type and description"""
     if pd.isna(prop_str):
         return None, None
-    
+    return _parse_property(str(prop_str))
+
+
+def parse_property_cache_info():
+    """Hit/miss statistics of the parse_property memo cache"""
+    return _parse_property.cache_info()
+
+
+def parse_properties(properties):
+    """Parse a column of property strings into property_type/property_of
+
+    Each distinct string is parsed once (through the parse_property memo
+    cache, which persists across calls) and the results are fanned back out
+    to the rows.
+    """
+    def parse_distinct(uniques):
+        parsed = [_parse_property(str(prop)) for prop in uniques]
+        return (
+            np.array([t for t, _ in parsed], dtype=object),
+            np.array([o for _, o in parsed], dtype=object)
+        )
+
+    property_type, property_of = map_distinct(properties, parse_distinct)
+    return pd.DataFrame({
+        'property_type': property_type,
+        'property_of': property_of
+    }, index=properties.index)
+
+
+@lru_cache(maxsize=PARSE_PROPERTY_CACHE_SIZE)
+def _parse_property(prop_str):
     # Handle "Rule of thumb" cases
     if 'rule of thumb' in prop_str.lower():
         # Find the part after "rule of thumb"
@@ -36,59 +76,119 @@ def parse_property(prop_str):
     return prop_str.strip(), None
 
 
+# Ordered scale categories, the first rule matching a row wins. A rule
+# matches when Properties contains one of its 'properties' keywords and
+# none of its 'exclude' keywords, or when Organism contains one of its
+# 'organisms' keywords. Rows matching no rule get DEFAULT_CATEGORY.
+CATEGORY_RULES = [
+    # Small molecules and proteins
+    {
+        'category': 'Small molecules & proteins',
+        'properties': ['molecule', 'protein', 'peptide', 'amino acid']
+    },
+    # DNA/RNA structures
+    {
+        'category': 'DNA/RNA structures',
+        'properties': [
+            'dna', 'rna', 'nucleotide', 'chromosome', 'chromatid',
+            'chromatin', 'nucleosome'
+        ]
+    },
+    # Nucleus/Nuclear structures
+    {
+        'category': 'Nuclei',
+        'properties': ['nucleus', 'nuclei', 'nuclear']
+    },
+    # Cell organelles
+    {
+        'category': 'Cell organelles',
+        'properties': [
+            'organelle', 'mitochondria', 'chloroplast',
+            'vesicle', 'ribosome', 'membrane', 'endoplasmic',
+            'periplasm', 'cytoplasm', 'envelope',
+            'golgi', 'lysosome', 'vacuole'
+        ]
+    },
+    # Individual cells
+    {
+        'category': 'Cells',
+        'properties': ['cell'],
+        'exclude': ['tissue', 'organ'],
+        'organisms': ['bacteria', 'coli']
+    },
+    # Tissues and larger structures
+    {
+        'category': 'Tissues & organs',
+        'properties': ['tissue', 'organ', 'skin', 'muscle']
+    }
+]
+
+DEFAULT_CATEGORY = 'Other'
+
+SCALE_CATEGORIES = [rule['category'] for rule in CATEGORY_RULES] + [DEFAULT_CATEGORY]
+
+
 def categorize_scale(row):
     """Categorize biological entities based on their size and properties"""
     prop = row['Properties'].lower()
     org = str(row['Organism']).lower() if pd.notna(row['Organism']) else ''
 
-    # Small molecules and proteins
-    if any(x in prop for x in ['molecule', 'protein', 'peptide', 'amino acid']):
-        return 'Small molecules & proteins'
+    for rule in CATEGORY_RULES:
+        if (
+            any(x in prop for x in rule['properties']) and
+            not any(x in prop for x in rule.get('exclude', []))
+        ) or any(x in org for x in rule.get('organisms', [])):
+            return rule['category']
+    return DEFAULT_CATEGORY
 
-    # DNA/RNA structures 
-    elif any(x in prop for x in [
-        'dna', 'rna', 'nucleotide', 'chromosome', 'chromatid',
-        'chromatin', 'nucleosome'
-    ]):
-        return 'DNA/RNA structures'
 
-    # Nucleus/Nuclear structures
-    elif any(x in prop for x in ['nucleus', 'nuclei', 'nuclear']):
-        return 'Nuclei'
+def _contains_any(values, keywords):
+    """Mask of the values containing any of the keywords as a substring"""
+    if not keywords:
+        return np.zeros(len(values), dtype=bool)
+    pattern = '|'.join(re.escape(k) for k in keywords)
+    return values.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
 
-    # Cell organelles
-    elif any(x in prop for x in [
-        'organelle', 'mitochondria', 'chloroplast',
-        'vesicle', 'ribosome', 'membrane', 'endoplasmic',
-        'periplasm', 'cytoplasm', 'envelope',
-        'golgi', 'lysosome', 'vacuole'
-    ]):
-        return 'Cell organelles'
 
-    # Individual cells
-    elif ('cell' in prop and not any(x in prop for x in ['tissue', 'organ'])) or \
-         any(x in org for x in ['bacteria', 'coli']):
-        return 'Cells'
+def categorize_scales(df):
+    """Vectorized categorize_scale, returning a categorical Series
 
-    # Tissues and larger structures
-    elif any(x in prop for x in ['tissue', 'organ', 'skin', 'muscle']):
-        return 'Tissues & organs'
+    Every rule in CATEGORY_RULES becomes a boolean mask evaluated over the
+    distinct Properties and Organism values, and the first matching rule
+    wins for each row.
+    """
+    prop_codes, props = pd.factorize(df['Properties'].str.lower())
+    org_codes, orgs = pd.factorize(df['Organism'].str.lower())
+    props = pd.Series(props, dtype=object)
+    orgs = pd.Series(orgs, dtype=object)
 
-    return 'Other'
+    masks = []
+    for rule in CATEGORY_RULES:
+        prop_mask = (
+            _contains_any(props, rule['properties']) &
+            ~_contains_any(props, rule.get('exclude', []))
+        )
+        org_mask = _contains_any(orgs, rule.get('organisms', []))
+        # Missing values match nothing
+        masks.append(
+            take_distinct(prop_codes, prop_mask, False) |
+            take_distinct(org_codes, org_mask, False)
+        )
 
+    codes = np.select(masks, range(len(CATEGORY_RULES)), default=len(CATEGORY_RULES))
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=SCALE_CATEGORIES),
+        index=df.index
+    )
 
-def clean_size_data(
-    df,
-    cell_volume_only=False,
-    general_size_only=True,
-    exclude_keywords=[]
-):
-    """Extract and clean size-related measurements"""
+
+def size_keywords(cell_volume_only=False, general_size_only=True):
+    """Keywords a property must contain to count as a size measurement"""
     if cell_volume_only and general_size_only:
         raise ValueError("Cannot set both cell_volume_only and general_size_only to True")
-    
+
     # Expanded keywords related to size measurements
-    size_keywords = [
+    return [
         'cell volume', 'volume of', 'volume'
     ] if cell_volume_only else [
         'length', 'diameter', 'volume', 'size', 'radius',
@@ -106,62 +206,294 @@ def clean_size_data(
     # ]
     # size_keywords.extend(specific_terms)
 
-    # Filter for size-related properties
-    mask = (
-        df['Properties'].str.lower().str.contains('|'.join(size_keywords), na=False) &
-        ~df['Properties'].str.lower().str.contains('|'.join(exclude_keywords), na=False)
+
+def size_data_mask(
+    df,
+    cell_volume_only=False,
+    general_size_only=True,
+    exclude_keywords=[]
+):
+    """Mask of the rows of df holding size-related properties
+
+    Keywords are matched as literal, case-insensitive substrings by an
+    automaton cached per keyword set.
+    """
+    keywords = size_keywords(cell_volume_only, general_size_only)
+    matches = compile_keyword_filter(keywords, exclude_keywords).match(
+        df['Properties']
     )
-    size_data = df[mask].copy()
+    return matches['include'] & ~matches['exclude']
+
+
+def warn_unknown_units(unknown):
+    """Print how many rows had a unit with no known dimension"""
+    if len(unknown):
+        print(
+            f"Warning: {unknown.sum()} rows across {len(unknown)} "
+            f"units with no known dimension were left unstandardized"
+        )
 
+
+def _lookup_units(units, debug_units, unknown_units):
+    factor, dimension, unknown = lookup_units(units, debug=debug_units)
+    # Collect the unknown units when asked to, so a caller cleaning several
+    # batches can warn once for all of them
+    if unknown_units is None:
+        warn_unknown_units(unknown)
+    else:
+        unknown_units.append(unknown)
+    return factor, pd.Series(dimension, index=units.index)
+
+
+def _standardize(values, units):
+    return pd.Series(values.to_numpy(dtype=float) * units[0], index=values.index)
+
+
+def _categorize(properties, organisms):
+    return categorize_scales(
+        pd.DataFrame({'Properties': properties, 'Organism': organisms})
+    )
+
+
+# Derived columns of clean_size_data as a dependency graph: each node maps
+# to the nodes or source columns it is computed from and a function of
+# their values. Nodes starting with '_' are shared intermediate results,
+# and graph options (debug_units, unknown_units) can be used as
+# dependencies too.
+SIZE_DATA_NODES = {
     # Store original values
-    size_data['original_value'] = size_data['Value']
-    size_data['original_range'] = size_data['Range']
-    
+    'original_value': (['Value'], lambda value: value),
+    'original_range': (['Range'], lambda value_range: value_range),
+
     # Parse property strings
-    property_parts = size_data['Properties'].apply(parse_property)
-    size_data['property_type'] = property_parts.apply(lambda x: x[0])
-    size_data['property_of'] = property_parts.apply(lambda x: x[1])
+    '_property_parts': (['Properties'], parse_properties),
+    'property_type': (['_property_parts'], lambda parts: parts['property_type']),
+    'property_of': (['_property_parts'], lambda parts: parts['property_of']),
 
     # Process single values
-    size_data['value'] = size_data['Value'].apply(extract_numeric_value)
-    size_data['standardized_value'] = size_data.apply(
-        lambda row: standardize_units(row['value'], row['Units']),
-        axis=1
-    )
+    '_value_parts': (['Value'], extract_numeric_columns),
+    'value': (['_value_parts'], lambda parts: parts['value']),
 
-    # Process ranges (regardless of whether value exists)
-    range_values = size_data['Range'].apply(extract_numeric_value)
-    
-    # Split ranges into min and max
-    size_data['min_value'] = range_values.apply(
-        lambda x: x[0] if isinstance(x, tuple) else None
-    )
-    size_data['max_value'] = range_values.apply(
-        lambda x: x[1] if isinstance(x, tuple) else None
-    )
+    # Process ranges (regardless of whether value exists) and split them
+    # into min and max
+    '_range_parts': (['Range'], extract_numeric_columns),
+    'min_value': (['_range_parts'], lambda parts: parts['min_value']),
+    'max_value': (['_range_parts'], lambda parts: parts['max_value']),
 
-    # Standardize units for range values
-    size_data['standardized_min'] = size_data.apply(
-        lambda row: standardize_units(row['min_value'], row['Units']),
-        axis=1
-    )
-    size_data['standardized_max'] = size_data.apply(
-        lambda row: standardize_units(row['max_value'], row['Units']),
-        axis=1
-    )
+    # Standardize units for single and range values, tagging each row with
+    # the dimension it was converted to
+    '_units': (['Units', 'debug_units', 'unknown_units'], _lookup_units),
+    'standardized_value': (['value', '_units'], _standardize),
+    'standardized_min': (['min_value', '_units'], _standardize),
+    'standardized_max': (['max_value', '_units'], _standardize),
+    'standardized_dimension': (['_units'], lambda units: units[1]),
 
     # Add category for scale
-    size_data['category'] = size_data.apply(categorize_scale, axis=1)
-
-    return size_data[[
-        'bion_id', 'Properties', 
-        'property_type', 'property_of',  # New columns
-        'Organism', 
-        'value',
-        'min_value', 'max_value',
-        'Units',
-        'standardized_value',
-        'standardized_min', 'standardized_max',
-        'category',
-        'original_value', 'original_range'
-    ]]
\ No newline at end of file
+    'category': (['Properties', 'Organism'], _categorize)
+}
+
+SIZE_DATA_COLUMNS = [
+    'bion_id', 'Properties', 
+    'property_type', 'property_of',  # New columns
+    'Organism', 
+    'value',
+    'min_value', 'max_value',
+    'Units',
+    'standardized_value',
+    'standardized_min', 'standardized_max',
+    'standardized_dimension',
+    'category',
+    'original_value', 'original_range'
+]
+
+
+class SizeDataGraph:
+    """Derived size columns over a frame, computed only when requested
+
+    Every node in SIZE_DATA_NODES is materialized at most once, together
+    with just the nodes it depends on. Unknown units are warned about when
+    they are looked up, or appended to the unknown_units list if one is
+    given.
+    """
+
+    def __init__(self, source, debug_units=False, unknown_units=None):
+        self.source = source
+        self._values = {'debug_units': debug_units, 'unknown_units': unknown_units}
+
+    def get(self, name):
+        """Value of a node or source column, computing it on first use"""
+        if name in self._values:
+            return self._values[name]
+        if name not in SIZE_DATA_NODES:
+            return self.source[name]
+
+        deps, func = SIZE_DATA_NODES[name]
+        value = func(*[self.get(dep) for dep in deps])
+        self._values[name] = value
+        return value
+
+    def dependencies(self, name):
+        """All nodes name is computed from, including itself"""
+        if name not in SIZE_DATA_NODES:
+            return set()
+        deps = {name}
+        for dep in SIZE_DATA_NODES[name][0]:
+            deps |= self.dependencies(dep)
+        return deps
+
+    def compute_sharded(self, columns, workers, shard_size=SHARD_SIZE):
+        """Materialize columns by running row shards in a process pool
+
+        Unit lookup runs once over all rows here, so its warning is printed
+        once; everything else is row-wise and computed per shard. Shards are
+        contiguous and combined in order, so the values are identical to
+        computing them serially.
+        """
+        missing = [
+            column for column in columns
+            if column in SIZE_DATA_NODES and column not in self._values
+        ]
+        needed = set().union(*[self.dependencies(column) for column in missing])
+        units = self.get('_units') if '_units' in needed else None
+
+        n = len(self.source)
+        starts = range(0, n, shard_size)
+        shards = [self.source.iloc[start:start + shard_size] for start in starts]
+        shard_units = [
+            None if units is None else
+            (units[0][start:start + shard_size], units[1].iloc[start:start + shard_size])
+            for start in starts
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(
+                _frame_shard, shards, shard_units,
+                [self._values['debug_units']] * len(shards),
+                [missing] * len(shards)
+            ))
+
+        combined = pd.concat(frames)
+        for column in missing:
+            self._values[column] = combined[column]
+
+    def frame(self, columns=SIZE_DATA_COLUMNS, workers=1, shard_size=SHARD_SIZE):
+        """Frame of the requested columns, in the order given
+
+        With more than one worker and more rows than fit in a shard, the
+        columns not computed yet are computed by compute_sharded.
+        """
+        if workers > 1 and len(self.source) > shard_size:
+            self.compute_sharded(columns, workers, shard_size)
+        return pd.DataFrame(
+            {column: self.get(column) for column in columns},
+            index=self.source.index
+        )
+
+
+def _frame_shard(shard, units, debug_units, columns):
+    """Worker side of SizeDataGraph.compute_sharded"""
+    graph = SizeDataGraph(shard, debug_units=debug_units)
+    if units is not None:
+        graph._values['_units'] = units
+    return graph.frame(columns)
+
+
+def size_data_graph(
+    df,
+    cell_volume_only=False,
+    general_size_only=True,
+    exclude_keywords=[],
+    debug_units=False,
+    unknown_units=None
+):
+    """SizeDataGraph over the size-related rows of df
+
+    The graph works on a copy of the matching rows and is owned by the
+    caller: keep it to request more columns later without recomputing the
+    shared intermediates, and drop it to free them. Changes made to df
+    afterwards are not seen by the graph.
+    """
+    mask = size_data_mask(df, cell_volume_only, general_size_only, exclude_keywords)
+    return SizeDataGraph(df[mask], debug_units=debug_units, unknown_units=unknown_units)
+
+
+def clean_size_data(
+    df,
+    cell_volume_only=False,
+    general_size_only=True,
+    exclude_keywords=[],
+    debug_units=False,
+    columns=SIZE_DATA_COLUMNS,
+    workers=1,
+    shard_size=SHARD_SIZE,
+    unknown_units=None
+):
+    """Extract and clean size-related measurements
+
+    Only the derived columns needed for the requested columns are computed;
+    use size_data_graph to compute further columns of the same rows without
+    repeating that work. Set debug_units to print each distinct unit string
+    that gets normalized. With workers > 1 the filtered rows are split into
+    shards of shard_size rows that are processed in parallel; the result is
+    the same as with a single worker.
+    """
+    graph = size_data_graph(
+        df, cell_volume_only, general_size_only, exclude_keywords, debug_units,
+        unknown_units
+    )
+    return graph.frame(columns, workers=workers, shard_size=shard_size)
+
+
+def clean_size_data_products(
+    df,
+    products,
+    debug_units=False,
+    columns=SIZE_DATA_COLUMNS,
+    workers=1,
+    shard_size=SHARD_SIZE,
+    unknown_units=None
+):
+    """Run clean_size_data for several filter settings in one pass
+
+    products maps a name to the size_data_mask keyword arguments of that
+    product. The derived columns are computed once over the union of the
+    matching rows and every product is then sliced out of that frame, so
+    each result equals clean_size_data with the same filters.
+    """
+    masks = {
+        name: size_data_mask(df, **filters).to_numpy(dtype=bool)
+        for name, filters in products.items()
+    }
+    union = np.logical_or.reduce(list(masks.values()))
+    graph = SizeDataGraph(df[union], debug_units=debug_units, unknown_units=unknown_units)
+    size_data = graph.frame(columns, workers=workers, shard_size=shard_size)
+    return {name: size_data[mask[union]] for name, mask in masks.items()}
+
+
+def clean_size_data_batches(batches, products=None, **kwargs):
+    """Run clean_size_data over record batches and combine the matches
+
+    Only the filtered rows of each batch are kept, so peak memory is bounded
+    by the batch size rather than the size of the raw export. With products
+    given, clean_size_data_products is run instead and a frame is returned
+    per product. Unknown units are counted over all batches and warned
+    about once. Raises ValueError if there are no batches.
+    """
+    cleaned = []
+    unknown_units = []
+    for batch in batches:
+        if products is None:
+            cleaned.append(clean_size_data(batch, unknown_units=unknown_units, **kwargs))
+        else:
+            cleaned.append(clean_size_data_products(
+                batch, products, unknown_units=unknown_units, **kwargs
+            ))
+    if not cleaned:
+        raise ValueError("No record batches to clean")
+    if unknown_units:
+        warn_unknown_units(pd.concat(unknown_units).groupby(level=0, sort=False).sum())
+    if products is None:
+        return pd.concat(cleaned)
+    return {
+        name: pd.concat([frames[name] for frames in cleaned])
+        for name in products
+    }
@@ -0,0 +1,210 @@
+import json
+import os
+from datetime import date
+
+from shared.util import (
+    iter_bionumbers_data,
+    load_bionumbers_data
+)
+from shared.bionumbers.parse import (
+    clean_size_data_batches,
+    clean_size_data_products,
+    SHARD_SIZE
+)
+from shared.bionumbers.query import (
+    select,
+    ECOLI_VOLUMES,
+    CELL_VOLUMES
+)
+from shared.bionumbers.incremental import (
+    RowFingerprints,
+    config_fingerprint,
+    row_fingerprints,
+    save_fingerprints
+)
+from shared.bionumbers.interval_index import (
+    SizeIntervalIndex,
+    interval_index_path
+)
+from shared.bionumbers.schema import (
+    parquet_path,
+    write_parquet
+)
+from shared.catalog import (
+    output_content_hash,
+    record_output
+)
+
+
+CELL_SIZE_EXCLUDE_KEYWORDS = [
+    'rate', 'constant', 'time', 'energy', 'force',
+    'concentration', 'abundance', 'number', 'strength',
+    'half-life', 'buffering capacity', 'thickness',
+    'density', 'weight', 'mass',
+    'ratio', 'fraction', 'percentage',
+    'selection coefficient', 'flux through',
+    'net pressure', 'maximum level',
+    'various kinds', 'rapidly degrading', 'free level',
+    'ph of', 'physical parameters', 'variation in',
+    'probability of', 'power', 'population', 'turnover of',
+    'activity of', 'translational diffusion', 'halflives of',
+    'affinity of', 'processivity of', 'speed of',
+    'diffusion coefficient', 'elemental composition',
+    'kinetic parameters', 'cytoplasmic ph', 'periplasmic ph',
+    'lacz mrna per', 'percent of heat shock', 'half-lives of',
+    'No. of ribosomes', 'comparison of channel counts', 'peak level of',
+    'reads per kilobase', 'review course', 'cutoff value', 'half life of',
+    'wavelength for', 'distance on', 'residual bulk', 'halflife of',
+    'contribution of', 'twenty most', 'internal ph', 'different temperatures',
+    'precursor requirements', 'cell dry yield', 'most abundant', 'protein copies',
+    'increase in', 'decrease in', 'co-segregation', 'cosegregation', 'replication speed',
+    'cellular location', 'resting potential', 'donnan potential', 'odor thresholds', 'halflife',
+    'peak in', 'oscillations', 'in the following organisms', 'atp demand', 'mechanoelectrical sensitivity',
+    'pool turnover', 'per unit', 'on tryptophan', 'of ocean water', 'volume usage', 'volume variation',
+    'volume, growth, and yield'
+]
+
+CELL_VOLUME_EXCLUDE_KEYWORDS = [
+    'rate', 'constant', 'time', 'energy', 'force',
+    'concentration', 'abundance', 'number', 'strength',
+    'half-life', 'buffering capacity', 'thickness',
+    'density', 'weight', 'mass',
+    'ratio', 'fraction', 'percentage',
+    'selection coefficient', 'flux through',
+    'net pressure', 'maximum level',
+    'various kinds', 'rapidly degrading', 'free level',
+    'ph of', 'physical parameters', 'variation in',
+    'probability of', 'power', 'population', 'turnover of',
+    'activity of', 'translational diffusion', 'halflives of',
+    'affinity of', 'processivity of', 'speed of',
+    'diffusion coefficient', 'elemental composition',
+    'kinetic parameters', 'cytoplasmic ph', 'periplasmic ph',
+    'lacz mrna per', 'percent of heat shock', 'half-lives of',
+    'No. of ribosomes', 'comparison of channel counts', 'peak level of',
+    'reads per kilobase', 'review course', 'cutoff value', 'half life of',
+    'wavelength for', 'distance on', 'residual bulk', 'halflife of',
+    'contribution of', 'twenty most', 'internal ph', 'different temperatures',
+    'precursor requirements', 'cell dry yield', 'most abundant', 'protein copies',
+    'increase in', 'decrease in', 'co-segregation', 'cosegregation', 'replication speed',
+    'cellular location', 'resting potential', 'donnan potential', 'odor thresholds', 'halflife',
+    'peak in', 'oscillations', 'in the following organisms', 'atp demand', 'mechanoelectrical sensitivity',
+    'pool turnover', 'per unit', 'on tryptophan', 'of ocean water', 'volume usage', 'volume variation',
+    'volume, growth, and yield', 'range of', 'results of', 'variability in', 'volume of blood',
+    'volumes for milk secreted', 'water accessible volumes', 'slope of log carbon',
+    'resolvable volumes', 'interspecies comparison', 'in different stages',
+    'water-accessible volumes', 'volumes inaccessible to', 
+]
+
+
+def filter_ecoli_volumes(df):
+    """Filter for E. coli and Generic volume data"""
+    return select(df, ECOLI_VOLUMES).sort_values(
+        by=['Organism', 'property_type', 'standardized_dimension', 'standardized_value', 'standardized_min'],
+        na_position='last'
+    )
+
+
+def filter_cell_volumes(df):
+    """Filter for cell volume measurements"""
+    return select(df, CELL_VOLUMES).sort_values(
+        by=['Organism', 'property_type', 'standardized_dimension', 'standardized_value', 'standardized_min'],
+        na_position='last'
+    )
+
+
+# Every processed BioNumbers product: the clean_size_data filters it is
+# built with, where it is written, how it is sorted and the subsets saved
+# next to it. Output directories are relative to WIP/.
+PRODUCTS = {
+    'processed_size_data': {
+        'output_dir': "./cell_size_dataset/output",
+        'clean': dict(
+            general_size_only=True,
+            exclude_keywords=CELL_SIZE_EXCLUDE_KEYWORDS
+        ),
+        'sort_by': ['Organism', 'standardized_dimension', 'standardized_min'],
+        'subsets': {}
+    },
+    'processed_cell_volume_data': {
+        'output_dir': "./cell_volume_dataset/output",
+        'clean': dict(
+            cell_volume_only=True,
+            general_size_only=False,
+            exclude_keywords=CELL_VOLUME_EXCLUDE_KEYWORDS
+        ),
+        'sort_by': ['property_type', 'standardized_dimension', 'standardized_value', 'standardized_min'],
+        'subsets': {
+            'ecoli_component_volume_subset': filter_ecoli_volumes,
+            'cell_volume_organisms_subset': filter_cell_volumes
+        }
+    }
+}
+
+
+def clean_products(names, workers=1, shard_size=SHARD_SIZE):
+    """Load the raw BioNumbers data and clean it for the named products
+
+    The export is streamed through the cleaning in record batches, so only
+    the matching rows are kept in memory. With more than one worker the
+    whole export is loaded instead, since the shards are split from the full
+    set of matching rows. Returns the cleaned frame of each product with the
+    raw data's source hash and row fingerprints.
+    """
+    products = {name: PRODUCTS[name]['clean'] for name in names}
+    if workers > 1:
+        df = load_bionumbers_data()
+        size_data = clean_size_data_products(
+            df, products, workers=workers, shard_size=shard_size
+        )
+        return size_data, df.attrs.get('source_hash'), row_fingerprints(df)
+
+    raw = RowFingerprints()
+    size_data = clean_size_data_batches(
+        raw.track(iter_bionumbers_data()), products=products
+    )
+    return size_data, raw.source_hash, raw.result()
+
+
+def save_output(output_dir, product, frame, source_hash, today):
+    """Write one dated output as CSV and typed Parquet and record it in the catalog"""
+    output_path = os.path.join(output_dir, f"{product}_{today}.csv")
+    frame.to_csv(output_path, index=False)
+    write_parquet(frame, parquet_path(output_path), product)
+    record_output(
+        output_dir, output_path, product, frame, source_hash,
+        copies=[parquet_path(output_path)]
+    )
+    return output_path
+
+
+def save_product(name, size_data, source_hash=None, fingerprints=None, changes=None, today=None):
+    """Write a processed product, its index, fingerprints and subsets
+
+    Returns the saved frames by output name, the processed data first.
+    """
+    product = PRODUCTS[name]
+    output_dir = product['output_dir']
+    if today is None:
+        today = date.today().strftime("%Y_%m_%d")
+
+    # Save full dataset
+    size_data_sorted = size_data.sort_values(product['sort_by'])
+    output_path = save_output(output_dir, name, size_data_sorted, source_hash, today)
+
+    # Save the range index over the standardized values of the saved rows
+    SizeIntervalIndex.from_frame(size_data_sorted).save(
+        interval_index_path(output_path), output_content_hash(output_path)
+    )
+
+    # Save the raw row fingerprints so the next run can be incremental
+    if fingerprints is not None:
+        save_fingerprints(output_path, fingerprints, config_fingerprint(**product['clean']))
+    if changes is not None:
+        with open(os.path.join(output_dir, f"changes_{name}_{today}.json"), 'w') as f:
+            json.dump(changes, f, indent=2)
+
+    saved = {name: size_data_sorted}
+    for subset, filter_subset in product['subsets'].items():
+        saved[subset] = filter_subset(size_data)
+        save_output(output_dir, subset, saved[subset], source_hash, today)
+    return saved
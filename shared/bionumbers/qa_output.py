@@ -1,80 +1,135 @@
+import itertools
+
 import pandas as pd
+from shared.units import STANDARD_UNITS
+from shared.bionumbers.qa_report import (
+    QAReport,
+    MAX_GROUPS,
+    MAX_ITEMS
+)
 
 
-def debug_categorization(size_data):
-    """Print sample entries from each category to verify categorization and standardization"""
-    print("\n=== DEBUG: Sample Entries by Category ===")
-    
-    # Sort by standardized value or min value within each category
+def categorization_report(size_data, samples_per_category=5, max_categories=MAX_GROUPS):
+    """Sample entries from each category, smallest standardized values first"""
+    report = QAReport(
+        "DEBUG: Sample Entries by Category",
+        max_groups=max_categories, max_items=samples_per_category
+    )
+
+    # Sort once, then take the first samples of every category in one pass
     size_data_sorted = size_data.sort_values(
-        by=['standardized_value', 'standardized_min'],
+        by=['standardized_dimension', 'standardized_value', 'standardized_min'],
         na_position='last'
     )
-    
+    samples = size_data_sorted.groupby(
+        'category', observed=True, sort=False
+    ).head(samples_per_category)
+    samples_by_category = dict(list(
+        samples.groupby('category', observed=True, sort=False)
+    ))
+    category_counts = size_data['category'].value_counts()
+
     for category in size_data['category'].unique():
-        print(f"\n{category}:")
-        samples = size_data_sorted[size_data_sorted['category'] == category].head(5)
-        for _, row in samples.iterrows():
-            print(f"- {row['Properties']} (ID: {row['bion_id']})")
+        group = report.add_group(category, total=category_counts.get(category))
+        if group is None:
+            continue
+        for row in samples_by_category[category].itertuples(index=False):
+            row = row._asdict()
+            details = {}
             if pd.notna(row['property_of']):
-                print(f"  Type: {row['property_type']}")
-                print(f"  Of: {row['property_of']}")
-            print(f"  Original Value: {row['original_value']}")
-            print(f"  Original Range: {row['original_range']}")
-            
+                details['Type'] = row['property_type']
+                details['Of'] = row['property_of']
+            details['Original Value'] = row['original_value']
+            details['Original Range'] = row['original_range']
+
+            standard_unit = STANDARD_UNITS.get(row['standardized_dimension'], '(unstandardized)')
             if pd.notna(row['value']):
-                print(f"  Value: {row['value']} {row['Units']}")
-                print(f"  Standardized: {row['standardized_value']} meters")
+                details['Value'] = f"{row['value']} {row['Units']}"
+                details['Standardized'] = f"{row['standardized_value']} {standard_unit}"
             elif pd.notna(row['min_value']):
-                print(f"  Range: {row['min_value']} - {row['max_value']} {row['Units']}")
-                print(f"  Standardized: {row['standardized_min']} - {row['standardized_max']} meters")
-            
+                details['Range'] = f"{row['min_value']} - {row['max_value']} {row['Units']}"
+                details['Standardized'] = (
+                    f"{row['standardized_min']} - {row['standardized_max']} {standard_unit}"
+                )
+
             if pd.notna(row['Organism']):
-                print(f"  Organism: {row['Organism']}")
-            print()
+                details['Organism'] = row['Organism']
+            report.add_item(
+                group, f"{row['Properties']} (ID: {row['bion_id']})", details,
+                bion_id=row['bion_id'],
+                standardized_value=row['standardized_value'],
+                standardized_min=row['standardized_min'],
+                standardized_max=row['standardized_max']
+            )
+    return report
 
 
-def analyze_property_types(size_data):
-    """Print distribution and examples of property types"""
-    print("\n=== Property Type Distribution ===")
-    
+def property_types_report(size_data, top=20):
+    """Distribution of property types, with an example property for each"""
+    report = QAReport("Property Type Distribution", max_items=top)
+
     # Get value counts and calculate percentages
     type_counts = size_data['property_type'].value_counts()
     type_percentages = (type_counts / len(size_data) * 100).round(1)
-    
-    # Print distribution
-    print(f"\nFound {len(type_counts)} unique property types across {len(size_data)} entries")
-    print("\nTop 20 most common property types:")
-    for prop_type, count in type_counts.head(20).items():
+    # First property of every type, found in the same pass for all types
+    examples = size_data.drop_duplicates('property_type').set_index('property_type')['Properties']
+
+    report.add_summary(
+        f"Found {len(type_counts)} unique property types across {len(size_data)} entries"
+    )
+    group = report.add_group(f"Top {top} most common property types", total=len(type_counts))
+    for prop_type, count in type_counts.head(top).items():
         percentage = type_percentages[prop_type]
-        print(f"{prop_type}: {count} ({percentage}%)")
-        # Show a sample property for this type
-        sample = size_data[size_data['property_type'] == prop_type]['Properties'].iloc[0]
-        print(f"  Example: {sample}\n")
+        report.add_item(
+            group, f"{prop_type}: {count} ({percentage}%)", {'Example': examples[prop_type]},
+            property_type=prop_type, count=count, percentage=percentage
+        )
+    return report
 
 
-def analyze_property_details(size_data, property_type):
-    """Analyze the distribution of property_of values for a given property type"""
-    print(f"\n=== Analysis of '{property_type}' Properties ===")
-    
+def property_details_report(size_data, property_type, max_groups=MAX_GROUPS, max_items=MAX_ITEMS):
+    """Distribution of property_of values and organisms for a property type"""
+    report = QAReport(
+        f"Analysis of '{property_type}' Properties",
+        max_groups=max_groups, max_items=max_items
+    )
+
     # Filter for the property type
     type_data = size_data[size_data['property_type'] == property_type]
-    
+
     # Group by property_of and organism, count occurrences
-    grouped = type_data.groupby(['property_of', 'Organism']).size().reset_index()
-    grouped.columns = ['property_of', 'Organism', 'count']
-    
+    grouped = type_data.groupby(['property_of', 'Organism']).size().reset_index(name='count')
+
     # Sort by count and property_of
     grouped = grouped.sort_values(['count', 'property_of'], ascending=[False, True])
-    
-    # Print summary
-    print(f"\nFound {len(type_data)} total '{property_type}' measurements")
-    print(f"Across {grouped['property_of'].nunique()} unique descriptions")
-    print(f"For {grouped['Organism'].nunique()} different organisms")
-    
-    print("\nDistribution:")
-    for prop_of in grouped['property_of'].unique():
-        prop_data = grouped[grouped['property_of'] == prop_of]
-        print(f"\n{prop_of}:")
-        for _, row in prop_data.iterrows():
-            print(f"  {row['Organism']}: {row['count']} measurements")
+
+    report.add_summary(f"Found {len(type_data)} total '{property_type}' measurements")
+    report.add_summary(f"Across {grouped['property_of'].nunique()} unique descriptions")
+    report.add_summary(f"For {grouped['Organism'].nunique()} different organisms")
+
+    by_property_of = grouped.groupby('property_of', sort=False)
+    report.omitted_groups = max(by_property_of.ngroups - max_groups, 0) if max_groups is not None else 0
+    for prop_of, prop_data in itertools.islice(by_property_of, max_groups):
+        group = report.add_group(prop_of, total=len(prop_data))
+        for organism, count in zip(prop_data['Organism'], prop_data['count']):
+            if not report.add_item(
+                group, f"{organism}: {count} measurements",
+                organism=organism, count=count
+            ):
+                break
+    return report
+
+
+def debug_categorization(size_data, fmt='text'):
+    """Print sample entries from each category to verify categorization and standardization"""
+    print(categorization_report(size_data).render(fmt))
+
+
+def analyze_property_types(size_data, fmt='text'):
+    """Print distribution and examples of property types"""
+    print(property_types_report(size_data).render(fmt))
+
+
+def analyze_property_details(size_data, property_type, fmt='text'):
+    """Analyze the distribution of property_of values for a given property type"""
+    print(property_details_report(size_data, property_type).render(fmt))
@@ -0,0 +1,139 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Default output caps, so QA over a large export stays readable
+MAX_GROUPS = 50
+MAX_ITEMS = 20
+
+
+def _to_json_value(value):
+    """Plain Python value for JSON output (numpy scalars, NA -> None)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return None
+    return value
+
+
+class QAReport:
+    """Structured QA report: summary lines and groups of labelled items
+
+    Each item has a label, display details (key -> text) and raw values
+    that are only included in the JSON output. Groups and items past the
+    caps are counted rather than kept.
+    """
+
+    def __init__(self, title, max_groups=MAX_GROUPS, max_items=MAX_ITEMS):
+        self.title = title
+        self.max_groups = max_groups
+        self.max_items = max_items
+        self.summary = []
+        self.groups = []
+        self.omitted_groups = 0
+
+    def add_summary(self, line):
+        self.summary.append(line)
+
+    def add_group(self, name=None, total=None):
+        """Start a group of items, or return None when past max_groups
+
+        total is the number of items the group has before capping, used to
+        report how many were left out.
+        """
+        if self.max_groups is not None and len(self.groups) >= self.max_groups:
+            self.omitted_groups += 1
+            return None
+        group = {'name': name, 'items': [], 'total': total}
+        self.groups.append(group)
+        return group
+
+    def add_item(self, group, label, details=None, **values):
+        """Add an item to a group, returning False once the group is full"""
+        if self.max_items is not None and len(group['items']) >= self.max_items:
+            return False
+        group['items'].append({
+            'label': label,
+            'details': details or {},
+            'values': {key: _to_json_value(v) for key, v in values.items()}
+        })
+        return True
+
+    @staticmethod
+    def _omitted_items(group):
+        if group['total'] is None:
+            return 0
+        return max(group['total'] - len(group['items']), 0)
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'summary': self.summary,
+            'groups': [
+                {
+                    'name': group['name'],
+                    'items': group['items'],
+                    'omitted_items': self._omitted_items(group)
+                }
+                for group in self.groups
+            ],
+            'omitted_groups': self.omitted_groups
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, default=str)
+
+    def to_text(self):
+        lines = ['', f"=== {self.title} ==="]
+        if self.summary:
+            lines.append('')
+            lines.extend(self.summary)
+        for group in self.groups:
+            lines.append('')
+            if group['name'] is not None:
+                lines.append(f"{group['name']}:")
+            for item in group['items']:
+                lines.append(f"- {item['label']}")
+                for key, text in item['details'].items():
+                    lines.append(f"  {key}: {text}")
+                if item['details']:
+                    lines.append('')
+            omitted = self._omitted_items(group)
+            if omitted:
+                lines.append(f"- ... and {omitted} more")
+        if self.omitted_groups:
+            lines.append('')
+            lines.append(f"... and {self.omitted_groups} more groups")
+        return '\n'.join(lines)
+
+    def to_markdown(self):
+        lines = [f"## {self.title}"]
+        for line in self.summary:
+            lines.extend(['', line])
+        for group in self.groups:
+            if group['name'] is not None:
+                lines.extend(['', f"### {group['name']}"])
+            lines.append('')
+            for item in group['items']:
+                lines.append(f"- {item['label']}")
+                for key, text in item['details'].items():
+                    lines.append(f"  - {key}: {text}")
+            omitted = self._omitted_items(group)
+            if omitted:
+                lines.append(f"- _... and {omitted} more_")
+        if self.omitted_groups:
+            lines.extend(['', f"_... and {self.omitted_groups} more groups_"])
+        return '\n'.join(lines) + '\n'
+
+    def render(self, fmt='text'):
+        """Render the report as 'text', 'markdown' or 'json'"""
+        renderers = {
+            'text': self.to_text,
+            'markdown': self.to_markdown,
+            'json': self.to_json
+        }
+        if fmt not in renderers:
+            raise ValueError(f"Unknown report format: {fmt}")
+        return renderers[fmt]()
@@ -0,0 +1,237 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from shared.distinct import take_distinct
+
+
+# Columns of the processed outputs that subsets are usually selected on.
+# Any other column is indexed the first time a predicate uses it.
+INDEXED_COLUMNS = ['Organism', 'property_type', 'property_of', 'category']
+
+
+class Predicate(ABC):
+    """Declarative row filter over a processed BioNumbers frame
+
+    Predicates are combined with &, | and ~ and are hashable, so the mask
+    a predicate compiles to can be cached by a DatasetIndex.
+    """
+
+    @abstractmethod
+    def _key(self):
+        """Tuple identifying the predicate, used for equality and hashing"""
+
+    @abstractmethod
+    def mask(self, index):
+        """Boolean row mask of the predicate over a DatasetIndex"""
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self._key()))
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self._key()!r}"
+
+
+class ColumnPredicate(Predicate):
+    """Predicate on the values of one column
+
+    It is evaluated once per distinct value of the column and mapped back
+    onto the rows through the column's factorized codes. Missing values
+    never match.
+    """
+
+    def __init__(self, column, case_sensitive=True):
+        self.column = column
+        self.case_sensitive = case_sensitive
+
+    @abstractmethod
+    def match(self, values):
+        """Boolean mask over an array of distinct, non-missing values"""
+
+    def mask(self, index):
+        return index.column_mask(self)
+
+
+class Equals(ColumnPredicate):
+    def __init__(self, column, value, case_sensitive=True):
+        super().__init__(column, case_sensitive)
+        self.value = value if case_sensitive else value.lower()
+
+    def _key(self):
+        return (self.column, self.value, self.case_sensitive)
+
+    def match(self, values):
+        return (values == self.value).to_numpy(dtype=bool)
+
+
+class IsIn(ColumnPredicate):
+    def __init__(self, column, values, case_sensitive=True):
+        super().__init__(column, case_sensitive)
+        self.values = tuple(v if case_sensitive else v.lower() for v in values)
+
+    def _key(self):
+        return (self.column, self.values, self.case_sensitive)
+
+    def match(self, values):
+        return values.isin(self.values).to_numpy(dtype=bool)
+
+
+class StartsWith(ColumnPredicate):
+    def __init__(self, column, prefix, case_sensitive=True):
+        super().__init__(column, case_sensitive)
+        self.prefix = prefix if case_sensitive else prefix.lower()
+
+    def _key(self):
+        return (self.column, self.prefix, self.case_sensitive)
+
+    def match(self, values):
+        return values.str.startswith(self.prefix, na=False).to_numpy(dtype=bool)
+
+
+class And(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def _key(self):
+        return self.predicates
+
+    def mask(self, index):
+        return np.logical_and.reduce([index.mask(p) for p in self.predicates])
+
+
+class Or(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def _key(self):
+        return self.predicates
+
+    def mask(self, index):
+        return np.logical_or.reduce([index.mask(p) for p in self.predicates])
+
+
+class Not(Predicate):
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def _key(self):
+        return (self.predicate,)
+
+    def mask(self, index):
+        return ~index.mask(self.predicate)
+
+
+class DatasetIndex:
+    """Factorized column indexes and compiled masks over one frame
+
+    Each column is factorized once. A column predicate is then evaluated
+    over the distinct values only, and every predicate's row mask and row
+    positions are cached, so repeated selections only pay for building the
+    subset. The frame must not be modified while it is indexed.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._columns = {}
+        self._masks = {}
+        self._positions = {}
+
+    def column(self, name, case_sensitive=True):
+        """(codes, distinct values) of a column, lowercased if not case_sensitive"""
+        key = (name, case_sensitive)
+        if key not in self._columns:
+            if case_sensitive:
+                codes, uniques = pd.factorize(self.df[name])
+                uniques = pd.Series(uniques, dtype=object)
+            else:
+                # Reuse the exact index: lowercase the distinct values and
+                # factorize those again
+                exact_codes, exact_uniques = self.column(name)
+                lower_codes, uniques = pd.factorize(exact_uniques.str.lower())
+                uniques = pd.Series(uniques, dtype=object)
+                codes = np.where(exact_codes < 0, -1, lower_codes.take(exact_codes))
+            self._columns[key] = (codes, uniques)
+        return self._columns[key]
+
+    def column_mask(self, predicate):
+        codes, uniques = self.column(predicate.column, predicate.case_sensitive)
+        # Missing values never match
+        return take_distinct(codes, predicate.match(uniques), False)
+
+    def mask(self, predicate):
+        """Boolean row mask of a predicate, computed once per predicate"""
+        if predicate not in self._masks:
+            self._masks[predicate] = predicate.mask(self)
+        return self._masks[predicate]
+
+    def positions(self, predicate):
+        """Row positions matching a predicate"""
+        if predicate not in self._positions:
+            self._positions[predicate] = np.flatnonzero(self.mask(predicate))
+        return self._positions[predicate]
+
+    def select(self, predicate):
+        """Rows of the frame matching a predicate"""
+        return self.df.iloc[self.positions(predicate)]
+
+
+def dataset_index(df):
+    """DatasetIndex over df with INDEXED_COLUMNS already factorized
+
+    The index is owned by the caller: keep it to make repeated selections
+    on the same frame, and build a new one once the frame has changed.
+    """
+    index = DatasetIndex(df)
+    for column in INDEXED_COLUMNS:
+        if column in df.columns:
+            index.column(column)
+    return index
+
+
+def select(df, predicate, index=None):
+    """Rows of df matching a predicate
+
+    Pass the DatasetIndex of df to reuse its factorized columns and masks
+    across selections; otherwise a new index is built for this call.
+    """
+    if index is None:
+        index = dataset_index(df)
+    return index.select(predicate)
+
+
+ECOLI = 'Bacteria Escherichia coli'
+GENERIC = 'Generic'
+
+# E. coli component and cell volumes, plus generic volumes
+ECOLI_VOLUMES = (
+    (
+        Equals('Organism', ECOLI) & (
+            StartsWith('property_type', 'Volume occupied by') |
+            Equals('property_type', '"Rule of thumb"') |
+            (Equals('property_type', 'Volume') & Equals('property_of', 'cell'))
+        )
+    ) |
+    (Equals('Organism', GENERIC) & Equals('property_type', 'Volume'))
+)
+
+# E. coli and generic radii, diameters and sizes
+ECOLI_SIZES = (
+    IsIn('Organism', [ECOLI, GENERIC]) &
+    IsIn('property_type', ['radius', 'diameter', 'size'], case_sensitive=False)
+)
+
+# Whole-cell volumes of every organism
+CELL_VOLUMES = Equals('Properties', 'cell volume', case_sensitive=False)
@@ -1,92 +1,164 @@
+import argparse
+import glob
+import os
+from datetime import date
+
 import pandas as pd
+from shared.bionumbers.reader import (
+    detect_file_format,
+    iter_bionumbers_batches,
+    read_bionumbers_html
+)
+from shared.profiling import (
+    EXACT,
+    HYPERLOGLOG,
+    profile_batches,
+    save_profile,
+    load_profile,
+    diff_profiles
+)
 
-def detect_file_format(filepath):
-    """Detect the actual file format by reading the first few bytes"""
-    with open(filepath, 'rb') as f:
-        header = f.read(8)
-        
-    # Check for common file signatures
-    if header.startswith(b'PK\x03\x04'):  # XLSX file
-        return 'xlsx'
-    elif header.startswith(b'\xD0\xCF\x11\xE0'):  # XLS file
-        return 'xls'
-    elif header.startswith(b'\r\n') or header.startswith(b'<'):  # Likely HTML/Text
-        return 'html'
-    return 'unknown'
-
-
-def save_unique_properties(df):
-    """Save unique Properties values to a text file, sorted alphabetically"""
-    unique_props = df['Properties'].unique()
-    
-    output_path = "bionumbers/qa/properties_list.txt"
+
+QA_DIR = "bionumbers/qa"
+
+
+def save_unique_properties(unique_props):
+    """Save unique Properties values to a text file, in order of first appearance"""
+    output_path = f"{QA_DIR}/properties_list.txt"
     with open(output_path, 'w') as f:
-        for prop in unique_props:
-            if pd.notna(prop):  # Skip NaN values
-                f.write(f"{prop}\n")
+        f.write(''.join(f"{prop}\n" for prop in unique_props))
     
     print(f"\n=== Unique Properties ===")
     print(f"Saved {len(unique_props)} unique properties to {output_path}")
 
 
-def analyze_raw_data():
-    """Perform basic quality analysis on the raw BioNumbers dataset"""
-    print("Loading raw BioNumbers data...")
-    filepath = "bionumbers/samples/raw_full_BioNumbers.xls"
-    
+def iter_raw_batches(filepath):
+    """Record batches of the raw export, streamed when it is HTML"""
     file_format = detect_file_format(filepath)
     print(f"Detected file format: {file_format}")
     
     if file_format == 'html':
-        # Try reading as HTML table
-        df = pd.read_html(filepath)[0]
-        # Set the first row as column headers
-        df.columns = df.iloc[0]
-        # Remove the first row since it's now the header
-        df = df.iloc[1:].reset_index(drop=True)
-    else:
-        try:
-            # Try reading as Excel
-            df = pd.read_excel(filepath)
-        except Exception as e:
-            print(f"Error reading as Excel: {e}")
-            print("Attempting to read as HTML...")
-            df = pd.read_html(filepath)[0]
-            # Set the first row as column headers
-            df.columns = df.iloc[0]
-            # Remove the first row since it's now the header
-            df = df.iloc[1:].reset_index(drop=True)
+        # Stream the HTML table, the reader picks up the header row itself
+        yield from iter_bionumbers_batches(filepath)
+        return
+    try:
+        # Try reading as Excel
+        df = pd.read_excel(filepath)
+    except Exception as e:
+        print(f"Error reading as Excel: {e}")
+        print("Attempting to read as HTML...")
+        df = read_bionumbers_html(filepath)
+    yield df
+
+
+def latest_profile(qa_dir=QA_DIR):
+    """Path of the most recent saved raw data profile, or None"""
+    profiles = sorted(glob.glob(os.path.join(qa_dir, "raw_profile_*.json")))
+    return profiles[-1] if profiles else None
+
+
+def print_profile_diff(diff):
+    """Print what changed between two raw data profiles"""
+    print(f"Rows: {diff['rows'][0]} -> {diff['rows'][1]}")
+    for column in diff['added_columns']:
+        print(f"Added column: {column}")
+    for column in diff['removed_columns']:
+        print(f"Removed column: {column}")
+    for column, changes in diff['columns'].items():
+        print(f"\n{column}:")
+        for key, change in changes.items():
+            if key.startswith('top_'):
+                print(f"  {key}: {change}")
+            else:
+                print(f"  {key}: {change[0]} -> {change[1]}")
+
+
+def analyze_raw_data(distinct=EXACT, capacity=None):
+    """Perform basic quality analysis on the raw BioNumbers dataset
+
+    Every statistic comes from a single streaming pass over the export. The
+    resulting column profile is saved in the QA directory and compared with
+    the previous one. With distinct=HYPERLOGLOG distinct counts are
+    estimated and at most capacity values are counted per column, so memory
+    stays bounded however many distinct values the export holds.
+    """
+    print("Loading raw BioNumbers data...")
+    filepath = "bionumbers/samples/raw_full_BioNumbers.xls"
+
+    # Keep the first batch for the sample and types, and collect the
+    # property names while the batches are profiled
+    first_batch = None
+    unique_props = {}
+
+    def batches():
+        nonlocal first_batch
+        for batch in iter_raw_batches(filepath):
+            if first_batch is None:
+                first_batch = batch
+            if 'Properties' in batch.columns:
+                unique_props.update(dict.fromkeys(batch['Properties'].dropna()))
+            yield batch
+
+    profile = profile_batches(batches(), distinct=distinct, capacity=capacity)
     
-    save_unique_properties(df)
+    save_unique_properties(list(unique_props))
     
     print("\n=== Basic Dataset Information ===")
-    print(f"Total rows: {len(df)}")
-    print(f"Total columns: {len(df.columns)}")
+    print(f"Total rows: {profile['rows']}")
+    print(f"Total columns: {len(profile['columns'])}")
 
     print("\n=== Columns ===")
-    for col in df.columns:
-        non_null = df[col].count()
-        pct_filled = (non_null / len(df)) * 100
-        print(f"{col}: {pct_filled:.1f}% filled ({non_null} non-null values)")
+    for col, col_profile in profile['columns'].items():
+        non_null = col_profile['non_null']
+        pct_filled = (1 - col_profile['null_fraction']) * 100
+        print(
+            f"{col}: {pct_filled:.1f}% filled ({non_null} non-null values, "
+            f"{col_profile['distinct']} distinct)"
+        )
 
     print("\n=== Sample Data (First 5 Rows) ===")
-    print(df.head())
+    print(first_batch.head())
 
     print("\n=== Data Types ===")
-    print(df.dtypes)
+    print(first_batch.dtypes)
 
-    print("\n=== Basic Statistics for Numeric Columns ===")
-    print(df.describe())
+    print("\n=== Basic Statistics for Numeric Values ===")
+    numeric = {
+        col: col_profile['numeric']
+        for col, col_profile in profile['columns'].items()
+        if col_profile['numeric'] is not None
+    }
+    print(pd.DataFrame(numeric))
 
     print("\n=== Value Counts for Selected Categorical Columns ===")
     categorical_columns = ['Organism', 'Units']
     for col in categorical_columns:
-        if col in df.columns:
+        if col in profile['columns']:
             print(f"\nTop 10 most common {col}:")
-            print(df[col].value_counts().head(10))
+            for value, count in profile['columns'][col]['top']:
+                print(f"{value}: {count}")
+
+    previous_path = latest_profile()
+    profile_path = f"{QA_DIR}/raw_profile_{date.today().strftime('%Y_%m_%d')}.json"
+    if previous_path is not None and previous_path != profile_path:
+        print(f"\n=== Changes Since {os.path.basename(previous_path)} ===")
+        print_profile_diff(diff_profiles(load_profile(previous_path), profile))
+    save_profile(profile, profile_path)
+    print(f"\nSaved column profile to {profile_path}")
 
 def main():
-    analyze_raw_data()
+    parser = argparse.ArgumentParser(description='Profile the raw BioNumbers export')
+    parser.add_argument('--distinct', choices=[EXACT, HYPERLOGLOG], default=EXACT,
+                      help='Count distinct values exactly, or estimate them with a fixed-size '
+                           'HyperLogLog sketch and keep a bounded top values summary (default: exact)')
+    parser.add_argument('--capacity', type=int, default=None,
+                      help='Values counted per column for the top values in hll mode '
+                           '(default: 50 times the number of top values)')
+    args = parser.parse_args()
+    if args.capacity is not None and args.distinct == EXACT:
+        parser.error('--capacity only applies with --distinct hll')
+
+    analyze_raw_data(distinct=args.distinct, capacity=args.capacity)
 
 if __name__ == "__main__":
     main()
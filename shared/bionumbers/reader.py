@@ -0,0 +1,197 @@
+import re
+from html.parser import HTMLParser
+
+import pandas as pd
+
+
+# Same strings pandas treats as missing when parsing an HTML table
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+    'n/a', 'nan', 'null'
+}
+
+_WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def detect_file_format(filepath):
+    """Detect the actual file format by reading the first few bytes"""
+    with open(filepath, 'rb') as f:
+        header = f.read(8)
+
+    # Check for common file signatures
+    if header.startswith(b'PK\x03\x04'):  # XLSX file
+        return 'xlsx'
+    elif header.startswith(b'\xD0\xCF\x11\xE0'):  # XLS file
+        return 'xls'
+    elif header.startswith(b'\r\n') or header.startswith(b'<'):  # Likely HTML/Text
+        return 'html'
+    return 'unknown'
+
+
+def sniff_html_encoding(filepath):
+    """Encoding declared by the HTML file, falling back to latin-1 like lxml"""
+    with open(filepath, 'rb') as f:
+        head = f.read(4096)
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    match = _CHARSET.search(head)
+    if match:
+        return match.group(1).decode('ascii')
+    return 'latin-1'
+
+
+class _TableRowParser(HTMLParser):
+    """Collect the rows of the first <table> as lists of cell strings"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.done = False
+        self._depth = 0
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'table':
+            self._depth += 1
+        elif self._depth != 1:
+            return
+        elif tag == 'tr':
+            self._end_row()
+            self._row = []
+        elif tag in ('td', 'th'):
+            self._end_cell()
+            if self._row is None:
+                self._row = []
+            self._cell = []
+        elif tag == 'br' and self._cell is not None:
+            # read_html turns line breaks into newlines, which then collapse
+            # to a space like any other run of whitespace
+            self._cell.append('\n')
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag == 'table':
+            if self._depth == 1:
+                self._end_row()
+                self.done = True
+            self._depth -= 1
+        elif self._depth != 1:
+            return
+        elif tag == 'tr':
+            self._end_row()
+        elif tag in ('td', 'th'):
+            self._end_cell()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _end_cell(self):
+        if self._cell is not None:
+            text = _WHITESPACE.sub(' ', ''.join(self._cell).strip())
+            self._row.append(None if text in NA_STRINGS else text)
+            self._cell = None
+
+    def _end_row(self):
+        self._end_cell()
+        if self._row:
+            self.rows.append(self._row)
+        self._row = None
+
+
+def _rows_to_frame(rows, columns, start):
+    """Build a string-typed batch, padding or trimming rows to the header"""
+    width = len(columns)
+    rows = [row[:width] + [None] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(rows, columns=columns, dtype='string')
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def iter_table_rows(filepath, chunk_size=1 << 16, encoding=None):
+    """Stream the rows of the export's first table as lists of cell strings
+
+    The file is fed to an incremental HTML parser chunk by chunk. The first
+    row yielded is the header; ValueError is raised if there is no table.
+    """
+    if encoding is None:
+        encoding = sniff_html_encoding(filepath)
+    parser = _TableRowParser()
+    found = False
+
+    with open(filepath, 'r', encoding=encoding, errors='replace') as f:
+        while not parser.done:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                parser.close()
+                parser._end_row()
+            else:
+                parser.feed(chunk)
+
+            rows, parser.rows = parser.rows, []
+            found = found or bool(rows)
+            yield from rows
+
+            if not chunk:
+                break
+
+    if not found:
+        raise ValueError(f"No table found in {filepath}")
+
+
+def iter_bionumbers_batches(filepath, batch_size=10000, chunk_size=1 << 16,
+                            encoding=None):
+    """Stream the Bionumbers HTML export as string-typed record batches
+
+    Only the rows of the batch being built are held in memory. The first
+    non-empty row of the table is used as the header, and batch indexes
+    continue from one batch to the next so concatenating them gives a 0..n-1
+    index. An export with a header but no data rows gives a single empty
+    batch, so callers always see the columns.
+    """
+    rows = iter_table_rows(filepath, chunk_size, encoding)
+    columns = [str(c) for c in next(rows)]
+    pending = []
+    start = 0
+
+    for row in rows:
+        pending.append(row)
+        if len(pending) == batch_size:
+            yield _rows_to_frame(pending, columns, start)
+            start += len(pending)
+            pending = []
+
+    if pending or start == 0:
+        yield _rows_to_frame(pending, columns, start)
+
+
+def read_bionumbers_html(filepath, chunk_size=1 << 16, encoding=None):
+    """Read the whole Bionumbers HTML export into a single frame
+
+    Cells are collected per column and each column is converted once, so
+    the table is never held as both batches and their concatenation. An
+    export with no data rows gives an empty frame with the header columns.
+    """
+    rows = iter_table_rows(filepath, chunk_size, encoding)
+    columns = [str(c) for c in next(rows)]
+    width = len(columns)
+    cells = [[] for _ in columns]
+
+    for row in rows:
+        row = row[:width] + [None] * (width - len(row))
+        for values, value in zip(cells, row):
+            values.append(value)
+
+    arrays = {}
+    for i in range(width):
+        arrays[i] = pd.array(cells[i], dtype='string')
+        cells[i] = None
+    df = pd.DataFrame(arrays)
+    df.columns = columns
+    return df
@@ -0,0 +1,157 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from shared.bionumbers.parse import SCALE_CATEGORIES
+from shared.bionumbers.query import select
+from shared.catalog import resolve_output
+from shared.table_render import table_source_columns
+
+
+# Bump SCHEMA_VERSION whenever the column types below change; Parquet files
+# stamped with another version are not read
+SCHEMA_VERSION = 1
+SCHEMA_METADATA_KEY = b'bionumbers_schema'
+
+# Columns of the processed outputs with few distinct values, stored as
+# categoricals. category always has the SCALE_CATEGORIES, in that order;
+# the others have their observed values, sorted, so sorting on them gives
+# the same order as sorting the strings.
+CATEGORY_COLUMNS = ['Organism', 'Units', 'property_type', 'standardized_dimension', 'category']
+
+# Measurement columns, always float64
+FLOAT_COLUMNS = [
+    'value', 'min_value', 'max_value',
+    'standardized_value', 'standardized_min', 'standardized_max'
+]
+
+PARQUET_COMPRESSION = 'zstd'
+
+# Analyzer table headers and the columns they show
+MEASUREMENT_TABLE_COLUMNS = {
+    "Property Type": 'property_type',
+    "Property Of": 'property_of',
+    "Value": 'value',
+    "Min": 'min_value',
+    "Max": 'max_value',
+    "Units": 'Units'
+}
+
+# Missing measurements are left blank in analyzer tables, other missing
+# values show as nan
+MEASUREMENT_NA_REP = {'value': '', 'min_value': '', 'max_value': ''}
+
+
+def apply_schema(df):
+    """Copy of a processed frame with the dataset's column types"""
+    df = df.copy()
+    for column in FLOAT_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('float64')
+    for column in CATEGORY_COLUMNS:
+        if column not in df.columns:
+            continue
+        if column == 'category':
+            df[column] = pd.Categorical(df[column], categories=SCALE_CATEGORIES)
+        else:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def parquet_path(output_path):
+    """Parquet copy stored next to a processed CSV output"""
+    return f"{os.path.splitext(output_path)[0]}.parquet"
+
+
+def write_parquet(df, path, product=None):
+    """Write df with the dataset schema as compressed Parquet
+
+    The schema version and product are stamped into the file's metadata.
+    """
+    table = pa.Table.from_pandas(apply_schema(df), preserve_index=False)
+    stamp = json.dumps({'version': SCHEMA_VERSION, 'product': product})
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        SCHEMA_METADATA_KEY: stamp.encode()
+    })
+    pq.write_table(table, path, compression=PARQUET_COMPRESSION)
+
+
+def schema_stamp(path):
+    """Schema stamp of a Parquet output, or None if it has none"""
+    metadata = pq.read_schema(path).metadata or {}
+    if SCHEMA_METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[SCHEMA_METADATA_KEY])
+
+
+def read_parquet(path, columns=None):
+    """Read only the requested columns of a Parquet output"""
+    stamp = schema_stamp(path)
+    if stamp is None or stamp['version'] != SCHEMA_VERSION:
+        raise ValueError(f"{path} was not written with schema version {SCHEMA_VERSION}")
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def read_output(output_path, columns=None):
+    """Load a processed output, reading only the requested columns
+
+    Reads the Parquet copy next to the CSV when there is one with the
+    current schema, and otherwise the CSV itself with the same types.
+    Requested columns the output does not have, such as derived columns
+    added after it was written, are left out.
+    """
+    path = parquet_path(output_path)
+    stamp = schema_stamp(path) if os.path.exists(path) else None
+    if stamp is not None and stamp['version'] == SCHEMA_VERSION:
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [column for column in columns if column in available]
+        return read_parquet(path, columns)
+    if columns is not None:
+        available = set(pd.read_csv(output_path, nrows=0).columns)
+        columns = [column for column in columns if column in available]
+    return apply_schema(pd.read_csv(output_path, usecols=columns))
+
+
+def add_as_of_argument(parser):
+    """Add the --as-of option of the analyzers to an argparse parser"""
+    parser.add_argument('--as-of', type=str, default=None,
+                      help='Analyze the latest output dated on or before this date (YYYY-MM-DD)')
+
+
+def read_selection(
+    output_dir,
+    product,
+    query,
+    table_columns=MEASUREMENT_TABLE_COLUMNS,
+    other_columns=(),
+    as_of=None
+):
+    """Rows of the latest output of product that match query
+
+    The output is the latest one dated on or before as_of (the latest of
+    all without it), verified against the catalog, and only the columns of
+    table_columns and other_columns are read. Returns (output path, the
+    frame read, the selected rows).
+    """
+    output_path = resolve_output(output_dir, product, as_of=as_of, verify=True)
+    df = read_output(output_path, table_source_columns(table_columns, other_columns))
+    return output_path, df, select(df, query)
+
+
+def observed_counts(column):
+    """value_counts of a column without its categories that have no rows
+
+    Ties are kept in order of first appearance, as value_counts does for
+    a column of strings.
+    """
+    codes, uniques = pd.factorize(column)
+    counts = pd.Series(
+        np.bincount(codes[codes >= 0], minlength=len(uniques)),
+        index=pd.Index(uniques, name=column.name), name='count'
+    )
+    return counts.sort_values(ascending=False, kind='stable')
@@ -0,0 +1,180 @@
+import glob
+import json
+import os
+import re
+from datetime import date, datetime, timezone
+
+from shared.util import file_content_hash
+
+
+CATALOG_NAME = "catalog.json"
+CATALOG_VERSION = 1
+
+# Outputs are named {product}_{YYYY_MM_DD}.{ext}
+_OUTPUT_DATE = re.compile(r'_(\d{4}_\d{2}_\d{2})\.\w+$')
+
+
+def catalog_path(output_dir):
+    return os.path.join(output_dir, CATALOG_NAME)
+
+
+def load_catalog(output_dir):
+    """Catalog of the outputs in output_dir, empty if there is none yet"""
+    path = catalog_path(output_dir)
+    if not os.path.exists(path):
+        return {'version': CATALOG_VERSION, 'products': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_catalog(output_dir, catalog):
+    """Write the catalog atomically so readers never see a partial file"""
+    path = catalog_path(output_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _as_date(value):
+    """ISO date string for a date, an ISO string or a YYYY_MM_DD string"""
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value.isoformat()
+    return value.replace('_', '-')
+
+
+def output_date(path):
+    """ISO date embedded in an output file name, or None"""
+    match = _OUTPUT_DATE.search(os.path.basename(path))
+    return _as_date(match.group(1)) if match else None
+
+
+def _file_state(path):
+    stat = os.stat(path)
+    return {
+        'content_hash': file_content_hash(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+
+
+def _file_matches(path, state):
+    # Same size and mtime is taken as unchanged; anything else is hashed
+    if not os.path.exists(path):
+        return False
+    stat = os.stat(path)
+    if 'size' in state and stat.st_size != state['size']:
+        return False
+    if stat.st_mtime_ns == state.get('mtime_ns'):
+        return True
+    return file_content_hash(path) == state['content_hash']
+
+
+def record_output(output_dir, path, product, df, source_hash=None, output_day=None,
+                  copies=()):
+    """Add or replace the catalog entry for an output just written to path
+
+    The entry holds the file's content hash, size and modification time,
+    the row count and schema of df (the frame that was written) and the
+    hash of the input it was generated from. copies are other files written
+    from the same frame (the Parquet copy), recorded the same way. Entries
+    are keyed by product and date, so rewriting an output on the same day
+    replaces its entry.
+    """
+    output_day = _as_date(output_day) or output_date(path) or date.today().isoformat()
+    entry = {
+        'product': product,
+        'date': output_day,
+        'path': os.path.relpath(path, output_dir),
+        **_file_state(path),
+        'copies': {
+            os.path.relpath(copy, output_dir): _file_state(copy) for copy in copies
+        },
+        'rows': len(df),
+        'schema': {str(column): str(dtype) for column, dtype in df.dtypes.items()},
+        'source_hash': source_hash,
+        'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    }
+    catalog = load_catalog(output_dir)
+    catalog['products'].setdefault(product, {})[output_day] = entry
+    save_catalog(output_dir, catalog)
+    return entry
+
+
+def find_output(output_dir, product, as_of=None):
+    """Catalog entry of the latest output of product dated on or before as_of
+
+    Returns None when the catalog has no such entry.
+    """
+    entries = load_catalog(output_dir)['products'].get(product, {})
+    as_of = _as_date(as_of)
+    days = [day for day in entries if as_of is None or day <= as_of]
+    if not days:
+        return None
+    return entries[max(days)]
+
+
+def verify_output(output_dir, entry):
+    """Whether an output and its copies still have the content recorded
+
+    A file with the recorded size and modification time is taken to be
+    unchanged; the file is only hashed when its timestamp differs (after a
+    copy or checkout) or the entry predates size and mtime being recorded.
+    A recorded copy that has since been deleted is not a mismatch, since
+    readers fall back to the output itself.
+    """
+    if not _file_matches(os.path.join(output_dir, entry['path']), entry):
+        return False
+    for copy, state in entry.get('copies', {}).items():
+        path = os.path.join(output_dir, copy)
+        if os.path.exists(path) and not _file_matches(path, state):
+            return False
+    return True
+
+
+def output_content_hash(path):
+    """Content hash of an output file
+
+    Taken from the file's catalog entry while the file still matches it,
+    and computed from the file otherwise.
+    """
+    output_dir, name = os.path.split(path)
+    for entries in load_catalog(output_dir or '.')['products'].values():
+        for entry in entries.values():
+            if entry['path'] == name and _file_matches(path, entry):
+                return entry['content_hash']
+    return file_content_hash(path)
+
+
+def resolve_output(output_dir, product, as_of=None, verify=False, ext='csv'):
+    """Path of the latest output of product dated on or before as_of
+
+    Uses the catalog when it has an entry, and otherwise falls back to the
+    date in the file names of {product}_*.{ext} files (never their
+    timestamps, which change on copy or checkout). With verify, a catalog
+    entry whose file or Parquet copy changed since it was recorded raises
+    ValueError.
+    """
+    entry = find_output(output_dir, product, as_of)
+    if entry is not None:
+        if verify and not verify_output(output_dir, entry):
+            raise ValueError(
+                f"{entry['path']} or a copy of it does not match its catalog entry "
+                f"for {entry['date']}"
+            )
+        return os.path.join(output_dir, entry['path'])
+
+    as_of = _as_date(as_of)
+    dated = [
+        (output_date(path), path)
+        for path in glob.glob(os.path.join(output_dir, f"{product}_*.{ext}"))
+    ]
+    dated = [
+        (day, path) for day, path in dated
+        if day is not None and (as_of is None or day <= as_of)
+    ]
+    if not dated:
+        raise FileNotFoundError(f"No {product} outputs found in {output_dir}")
+    return max(dated)[1]
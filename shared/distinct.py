@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+
+def take_distinct(codes, results, missing=None):
+    """Fan results computed per distinct value back out to the rows
+
+    codes are the factorized codes of the rows (as pd.factorize returns
+    them, -1 for missing values) and results holds one entry per distinct
+    value. Rows with a missing value get missing.
+    """
+    results = np.asarray(results)
+    if results.dtype.kind == 'U':
+        results = results.astype(object)
+    # One extra slot at the end holds the result for missing values
+    padded = np.empty(len(results) + 1, dtype=results.dtype)
+    padded[:-1] = results
+    padded[-1] = missing
+    return padded.take(np.where(codes < 0, len(results), codes))
+
+
+def map_distinct(values, fn, missing=None):
+    """Apply fn once to the distinct values of a column and map the results back
+
+    fn gets the distinct non-missing values, as pd.factorize returns them,
+    and returns an array with one result per value, or a tuple of such
+    arrays. Rows with a missing value get missing, or the matching entry of
+    missing when fn returns a tuple. Returns an array (or a tuple of
+    arrays) aligned with values.
+    """
+    codes, uniques = pd.factorize(values)
+    results = fn(uniques)
+    if not isinstance(results, tuple):
+        return take_distinct(codes, results, missing)
+    if not isinstance(missing, tuple):
+        missing = (missing,) * len(results)
+    return tuple(take_distinct(codes, r, m) for r, m in zip(results, missing))
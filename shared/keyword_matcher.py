@@ -0,0 +1,120 @@
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from shared.distinct import map_distinct
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton matching a fixed set of keywords as literals
+
+    Keywords are lowercased, so scan lowercased text. A scan walks the text
+    once no matter how many keywords there are.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = [k for k in dict.fromkeys(k.lower() for k in keywords) if k]
+        self._goto = [{}]
+        self._out = [()]
+
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._out.append(())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state] += (keyword_id,)
+
+        # Breadth-first so every fail target is complete before it is used.
+        # Missing transitions are filled in from the fail state, turning the
+        # trie into a DFA so a scan needs one dict lookup per character.
+        fail = [0] * len(self._goto)
+        self._delta = [dict(edges) for edges in self._goto]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self._delta[fail[state]].items():
+                self._delta[state].setdefault(char, target)
+            for char, child in self._goto[state].items():
+                fail[child] = self._delta[fail[state]].get(char, 0)
+                self._out[child] += self._out[fail[child]]
+                queue.append(child)
+
+    def scan(self, text):
+        """Ids of the keywords found in text, in the order their matches end"""
+        delta, out = self._delta, self._out
+        found = []
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+
+class KeywordFilter:
+    """Include/exclude keyword sets compiled into a single automaton"""
+
+    def __init__(self, include, exclude):
+        self.include = [k.lower() for k in include if k]
+        self.exclude = [k.lower() for k in exclude if k]
+        self.automaton = KeywordAutomaton(self.include + self.exclude)
+        keywords = self.automaton.keywords
+        self._is_include = np.isin(keywords, self.include)
+        self._is_exclude = np.isin(keywords, self.exclude)
+
+    def match(self, properties):
+        """Match a column of property strings against both keyword sets
+
+        Each distinct lowercased property is scanned once. Returns a frame
+        aligned with properties: 'include' (any include keyword found, or
+        True when there are no include keywords), 'exclude' (any exclude
+        keyword found) and 'keyword' (the first exclude keyword found,
+        otherwise the first include keyword). Missing properties match
+        nothing and are never included.
+        """
+        include, exclude, keyword = map_distinct(
+            properties.str.lower(), self._match_distinct, missing=(False, False, None)
+        )
+        return pd.DataFrame({
+            'include': include,
+            'exclude': exclude,
+            'keyword': keyword
+        }, index=properties.index)
+
+    def _match_distinct(self, uniques):
+        """(include, exclude, keyword) arrays for distinct lowercased properties"""
+        n = len(uniques)
+        include = np.full(n, not self.include, dtype=bool)
+        exclude = np.zeros(n, dtype=bool)
+        keyword = np.full(n, None, dtype=object)
+
+        keywords = self.automaton.keywords
+        for i, text in enumerate(uniques):
+            found = self.automaton.scan(text)
+            if not found:
+                continue
+            hit_include = [k for k in found if self._is_include[k]]
+            hit_exclude = [k for k in found if self._is_exclude[k]]
+            if hit_include:
+                include[i] = True
+            if hit_exclude:
+                exclude[i] = True
+                keyword[i] = keywords[hit_exclude[0]]
+            elif hit_include:
+                keyword[i] = keywords[hit_include[0]]
+        return include, exclude, keyword
+
+
+@lru_cache(maxsize=32)
+def _compiled_filter(include, exclude):
+    return KeywordFilter(include, exclude)
+
+
+def compile_keyword_filter(include, exclude):
+    """KeywordFilter for the given keyword sets, cached per distinct pair"""
+    return _compiled_filter(tuple(include), tuple(exclude))
@@ -0,0 +1,231 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+PROFILE_VERSION = 1
+
+# Distinct counting methods: keep every distinct value, or estimate with a
+# HyperLogLog sketch of fixed size
+EXACT = 'exact'
+HYPERLOGLOG = 'hll'
+
+HLL_PRECISION = 14
+
+
+def hash_values(values):
+    """Stable 64-bit hashes of a column of values (same across runs)"""
+    return pd.util.hash_pandas_object(
+        pd.Series(values, dtype=object).astype(str), index=False
+    ).to_numpy()
+
+
+def _leading_zeros(x):
+    """Leading zero bits of each uint64 in x (64 for zero)"""
+    x = x.copy()
+    zeros = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high_clear = (x >> np.uint64(64 - shift)) == 0
+        zeros += high_clear * shift
+        x = np.where(high_clear, x << np.uint64(shift), x)
+    zeros += x == 0
+    return zeros
+
+
+class HyperLogLog:
+    """HyperLogLog distinct count estimate over 2**precision registers"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes):
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(p)), 64 - p) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        empty = np.count_nonzero(self.registers == 0)
+        # Linear counting is more accurate while many registers are empty
+        if estimate <= 2.5 * m and empty:
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
+
+
+class ColumnProfiler:
+    """Running profile of one column, updated one batch at a time
+
+    Tracks nulls, distinct values (exactly or with HyperLogLog), the most
+    frequent values and, for values that parse as numbers, count, min, max,
+    mean and standard deviation.
+
+    Frequent values are kept as a Misra-Gries summary of `capacity`
+    counters: whenever more values are being counted, the smallest counts
+    are dropped, so each reported count is low by at most top_error. In
+    exact mode every value is counted and top_error is always 0.
+    """
+
+    def __init__(self, distinct=EXACT, top_k=10, capacity=None):
+        if distinct not in (EXACT, HYPERLOGLOG):
+            raise ValueError(f"Unknown distinct counting method: {distinct}")
+        self.distinct = distinct
+        self.top_k = top_k
+        self.capacity = None if distinct == EXACT else (capacity or 50 * top_k)
+        self.rows = 0
+        self.non_null = 0
+        self.counts = pd.Series(dtype='int64', index=pd.Index([], dtype=object))
+        self.top_error = 0
+        self.hll = HyperLogLog() if distinct == HYPERLOGLOG else None
+        self.numeric = {'count': 0, 'min': np.inf, 'max': -np.inf, 'mean': 0.0, 'm2': 0.0}
+
+    def update(self, values):
+        self.rows += len(values)
+        present = values.dropna()
+        self.non_null += len(present)
+        if not len(present):
+            return
+
+        batch_counts = present.value_counts(sort=False)
+        batch_counts.index = batch_counts.index.astype(object)
+        # Keep values in order of first appearance, so that top values
+        # with equal counts are reported in that order (Series.add would
+        # sort the union of both indexes)
+        index = self.counts.index.append(
+            batch_counts.index.difference(self.counts.index, sort=False)
+        )
+        self.counts = (
+            self.counts.reindex(index, fill_value=0) +
+            batch_counts.reindex(index, fill_value=0)
+        ).astype('int64')
+        if self.capacity is not None and len(self.counts) > self.capacity:
+            # Only values counted more often than the (capacity + 1)th
+            # largest count survive the decrement
+            threshold = int(self.counts.nlargest(self.capacity + 1).iloc[-1])
+            self.top_error += threshold
+            self.counts = self.counts - threshold
+            self.counts = self.counts[self.counts > 0]
+        if self.hll is not None:
+            self.hll.update(hash_values(batch_counts.index))
+
+        self._update_numeric(pd.to_numeric(present, errors='coerce').dropna())
+
+    def _update_numeric(self, numbers):
+        """Merge the batch into the running numeric summary (Chan et al.)"""
+        n = len(numbers)
+        if not n:
+            return
+        numbers = numbers.to_numpy(dtype=float)
+        stats = self.numeric
+        mean = numbers.mean()
+        m2 = ((numbers - mean) ** 2).sum()
+        total = stats['count'] + n
+        delta = mean - stats['mean']
+        stats['mean'] += delta * n / total
+        stats['m2'] += m2 + delta ** 2 * stats['count'] * n / total
+        stats['count'] = total
+        stats['min'] = min(stats['min'], numbers.min())
+        stats['max'] = max(stats['max'], numbers.max())
+
+    def result(self):
+        top = self.counts.sort_values(ascending=False, kind='stable').head(self.top_k)
+        profile = {
+            'rows': self.rows,
+            'non_null': self.non_null,
+            'null_fraction': 1 - self.non_null / self.rows if self.rows else 0.0,
+            'distinct': len(self.counts) if self.hll is None else self.hll.estimate(),
+            'distinct_method': self.distinct,
+            'top': [[str(value), int(count)] for value, count in top.items()],
+            'top_error': self.top_error,
+            'numeric': None
+        }
+        stats = self.numeric
+        if stats['count']:
+            profile['numeric'] = {
+                'count': stats['count'],
+                'min': float(stats['min']),
+                'max': float(stats['max']),
+                'mean': float(stats['mean']),
+                'std': float(np.sqrt(stats['m2'] / (stats['count'] - 1)))
+                if stats['count'] > 1 else None
+            }
+        return profile
+
+
+def profile_batches(batches, distinct=EXACT, top_k=10, capacity=None):
+    """Profile every column of a stream of record batches in one pass
+
+    Returns a JSON-serializable dict with the row count, the columns in
+    order and a ColumnProfiler result per column.
+    """
+    profilers = {}
+    rows = 0
+    for batch in batches:
+        rows += len(batch)
+        for column in batch.columns:
+            if column not in profilers:
+                profilers[column] = ColumnProfiler(distinct, top_k, capacity)
+                # Rows of earlier batches that lacked this column count as null
+                profilers[column].rows = rows - len(batch)
+            profilers[column].update(batch[column])
+        for column in profilers.keys() - set(batch.columns):
+            profilers[column].rows += len(batch)
+
+    return {
+        'version': PROFILE_VERSION,
+        'rows': rows,
+        'columns': {column: profiler.result() for column, profiler in profilers.items()}
+    }
+
+
+def save_profile(profile, path):
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+
+def load_profile(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def diff_profiles(old, new):
+    """Changes between two profiles, column by column
+
+    Only columns whose profile changed are listed. For each, the old and
+    new value of every changed summary statistic is given, along with the
+    values that entered or left the top values.
+    """
+    diff = {
+        'rows': [old['rows'], new['rows']],
+        'added_columns': [c for c in new['columns'] if c not in old['columns']],
+        'removed_columns': [c for c in old['columns'] if c not in new['columns']],
+        'columns': {}
+    }
+    for column, new_col in new['columns'].items():
+        old_col = old['columns'].get(column)
+        if old_col is None:
+            continue
+        changes = {}
+        for key in ['non_null', 'null_fraction', 'distinct']:
+            if old_col[key] != new_col[key]:
+                changes[key] = [old_col[key], new_col[key]]
+
+        old_numeric = old_col['numeric'] or {}
+        new_numeric = new_col['numeric'] or {}
+        for key in ['count', 'min', 'max', 'mean', 'std']:
+            if old_numeric.get(key) != new_numeric.get(key):
+                changes[f"numeric_{key}"] = [old_numeric.get(key), new_numeric.get(key)]
+
+        old_top = {value for value, _ in old_col['top']}
+        new_top = {value for value, _ in new_col['top']}
+        if old_top != new_top:
+            changes['top_added'] = sorted(new_top - old_top)
+            changes['top_removed'] = sorted(old_top - new_top)
+
+        if changes:
+            diff['columns'][column] = changes
+    return diff
@@ -0,0 +1,178 @@
+import csv
+import sys
+
+import numpy as np
+import pandas as pd
+
+from shared.distinct import map_distinct
+
+
+TABLE_FORMATS = ['fixed', 'markdown', 'csv']
+
+# Rows formatted and written at a time
+CHUNK_SIZE = 10000
+
+
+def table_source_columns(columns, others=()):
+    """Columns a table of columns (a list, or a header -> column dict) reads,
+    followed by others, each named once"""
+    if isinstance(columns, dict):
+        columns = columns.values()
+    return list(dict.fromkeys([*columns, *others]))
+
+
+def _column_spec(df, columns):
+    """(headers, source columns) from a list of columns or a header -> column dict"""
+    if columns is None:
+        columns = list(df.columns)
+    if isinstance(columns, dict):
+        return list(columns), list(columns.values())
+    return [str(c) for c in columns], list(columns)
+
+
+def format_column(values, max_width=None, na_rep='nan'):
+    """Format a column as an array of display strings
+
+    Missing values become na_rep, line breaks become spaces and values
+    longer than max_width are cut. Each distinct value is formatted once.
+    """
+    def format_distinct(uniques):
+        text = pd.Series(uniques, dtype=object).astype(str)
+        text = text.str.replace(r'[\r\n]+', ' ', regex=True)
+        if max_width is not None:
+            text = text.str.slice(0, max_width)
+        return text.to_numpy(dtype=object)
+
+    return map_distinct(values, format_distinct, na_rep)
+
+
+def _formatted_chunks(df, columns, max_width, chunk_size, na_rep):
+    """Formatted columns of df, chunk_size rows at a time"""
+    if not isinstance(na_rep, dict):
+        na_rep = dict.fromkeys(columns, na_rep)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        yield [
+            format_column(chunk[column], max_width, na_rep.get(column, 'nan'))
+            for column in columns
+        ]
+
+
+def _column_widths(df, headers, columns, max_width, chunk_size, na_rep):
+    """Width of every column over the header and all rows, one chunk at a time"""
+    widths = [len(header) for header in headers]
+    for chunk in _formatted_chunks(df, columns, max_width, chunk_size, na_rep):
+        for i, text in enumerate(chunk):
+            widths[i] = max([widths[i]] + [len(value) for value in set(text)])
+    if max_width is not None:
+        widths = [min(width, max_width) for width in widths]
+    return widths
+
+
+def _row_template(widths):
+    """Format string for one '| a | b |' row, padding cells to widths"""
+    return '| ' + ' | '.join(f"{{:<{width}}}" for width in widths) + ' |'
+
+
+def _escape_markdown(text):
+    return np.array([value.replace('|', r'\|') for value in text], dtype=object)
+
+
+def render_table(
+    df,
+    columns=None,
+    fmt='fixed',
+    out=None,
+    max_width=None,
+    page_size=None,
+    page=None,
+    chunk_size=CHUNK_SIZE,
+    na_rep='nan'
+):
+    """Write df as a table, formatting and writing one chunk of rows at a time
+
+    columns is a list of column names or a dict mapping headers to column
+    names. fmt is 'fixed' (bordered, left-aligned columns), 'markdown' or
+    'csv'. Values longer than max_width are truncated, not wrapped onto
+    more lines. Missing values are shown as na_rep, which can also be a
+    dict of column name to text (other columns show 'nan'). With
+    page_size, the fixed and markdown formats repeat the header every
+    page_size rows, and page (0-based) renders only that page. out is a file object or path and
+    defaults to stdout. Returns the number of rows written.
+    """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format: {fmt}")
+    headers, columns = _column_spec(df, columns)
+    if page is not None:
+        if page_size is None:
+            raise ValueError("page requires page_size")
+        df = df.iloc[page * page_size:(page + 1) * page_size]
+    if page_size is not None:
+        chunk_size = page_size
+
+    if isinstance(out, str):
+        with open(out, 'w', newline='' if fmt == 'csv' else None) as f:
+            return render_table(df, dict(zip(headers, columns)), fmt, f, max_width,
+                                page_size, None, chunk_size, na_rep)
+    if out is None:
+        out = sys.stdout
+
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(headers)
+        for chunk in _formatted_chunks(df, columns, max_width, chunk_size, na_rep):
+            writer.writerows(zip(*chunk))
+        return len(df)
+
+    if fmt == 'markdown':
+        template = _row_template([0] * len(headers))
+        header = template.format(*[h.replace('|', r'\|') for h in headers])
+        rule = '|' + '|'.join(['---'] * len(headers)) + '|'
+        out.write(header + '\n' + rule + '\n')
+        for i, chunk in enumerate(_formatted_chunks(df, columns, max_width, chunk_size, na_rep)):
+            if i and page_size is not None:
+                out.write('\n' + header + '\n' + rule + '\n')
+            chunk = [_escape_markdown(text) for text in chunk]
+            out.write('\n'.join(template.format(*row) for row in zip(*chunk)) + '\n')
+        return len(df)
+
+    widths = _column_widths(df, headers, columns, max_width, chunk_size, na_rep)
+    template = _row_template(widths)
+    border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+    header = template.format(*[h[:w] for h, w in zip(headers, widths)])
+    out.write(border + '\n' + header + '\n' + border + '\n')
+    for i, chunk in enumerate(_formatted_chunks(df, columns, max_width, chunk_size, na_rep)):
+        if i and page_size is not None:
+            out.write(border + '\n' + header + '\n' + border + '\n')
+        out.write('\n'.join(template.format(*row) for row in zip(*chunk)) + '\n')
+    out.write(border + '\n')
+    return len(df)
+
+
+def add_table_arguments(parser, max_width=40):
+    """Add the render_table options to an argparse parser
+
+    Turn the parsed arguments back into render_table keyword arguments
+    with render_options.
+    """
+    parser.add_argument('--table-format', choices=TABLE_FORMATS, default='fixed',
+                      help='Format of the table')
+    parser.add_argument('--max-width', type=int, default=max_width,
+                      help='Truncate table values to this many characters (they are not wrapped)')
+    parser.add_argument('--page-size', type=int, default=None,
+                      help='Repeat the table header every this many rows')
+    parser.add_argument('--page', type=int, default=None,
+                      help='Only show this page of the table (0-based, needs --page-size)')
+    parser.add_argument('--table-output', type=str, default=None,
+                      help='Write the table to this file instead of stdout')
+
+
+def render_options(args):
+    """render_table keyword arguments from the options add_table_arguments added"""
+    return dict(
+        fmt=args.table_format,
+        max_width=args.max_width,
+        page_size=args.page_size,
+        page=args.page,
+        out=args.table_output
+    )
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The shared package is imported from the repository root, as the scripts
+# under WIP/ do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
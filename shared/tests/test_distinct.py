@@ -0,0 +1,34 @@
+"""Per-distinct results fanned back out to the rows."""
+import numpy as np
+import pandas as pd
+
+from shared.distinct import map_distinct, take_distinct
+
+
+def test_map_distinct_calls_fn_once_per_distinct_value():
+    values = pd.Series(['b', None, 'a', 'b', 'a'], dtype='string')
+    seen = []
+
+    def upper(uniques):
+        seen.append(list(uniques))
+        return [u.upper() for u in uniques]
+
+    result = map_distinct(values, upper, missing='-')
+    assert seen == [['b', 'a']]
+    assert result.dtype == object
+    assert result.tolist() == ['B', '-', 'A', 'B', 'A']
+
+
+def test_map_distinct_tuple_keeps_each_dtype():
+    values = pd.Series([2.0, np.nan, 3.0, 2.0])
+    squared, kind = map_distinct(
+        values, lambda u: (u ** 2, np.ones(len(u), dtype='int8')), missing=(np.nan, 0)
+    )
+    np.testing.assert_array_equal(squared, [4.0, np.nan, 9.0, 4.0])
+    assert kind.dtype == np.int8
+    assert kind.tolist() == [1, 0, 1, 1]
+
+
+def test_take_distinct_all_missing():
+    codes = np.array([-1, -1])
+    assert take_distinct(codes, np.array([], dtype=bool), False).tolist() == [False, False]
@@ -0,0 +1,59 @@
+"""incremental_clean_size_data against a full rerun of clean_size_data."""
+import os
+
+import pandas as pd
+import pytest
+
+from shared.util import read_bionumbers_file
+from shared.bionumbers.parse import clean_size_data
+from shared.bionumbers.incremental import (
+    config_fingerprint,
+    incremental_clean_size_data,
+    save_fingerprints
+)
+from shared.bionumbers.products import PRODUCTS
+
+EXPORT = os.path.join(os.path.dirname(__file__), 'fixtures', 'bionumbers_export.xls')
+
+
+def save_run(output_dir, product, size_data, fingerprints, today):
+    """Save an output and its fingerprints as save_product does"""
+    output_path = os.path.join(output_dir, f"{product}_{today}.csv")
+    size_data.sort_values(PRODUCTS[product]['sort_by']).to_csv(output_path, index=False)
+    save_fingerprints(output_path, fingerprints, config_fingerprint(**PRODUCTS[product]['clean']))
+
+
+def edit_export(df, kept_ids):
+    """The export with rows added, changed and removed, some of them kept by the product"""
+    kept = df['bion_id'].isin(kept_ids).to_numpy()
+    edited = df.drop(index=df.index[kept][:3])
+
+    # A kept row and a dropped row get new values, a kept row a new unit
+    changed_ids = [df['bion_id'][kept].iloc[3], df['bion_id'][~kept].iloc[0]]
+    edited.loc[edited['bion_id'].isin(changed_ids), 'Value'] = '7.5'
+    edited.loc[edited['bion_id'] == df['bion_id'][kept].iloc[4], 'Units'] = 'nm'
+
+    added = df[kept].iloc[5:8].copy()
+    added['bion_id'] = ['900001', '900002', '900003']
+    added['Value'] = ['2', '0.5 to 1', '40']
+    edited = pd.concat([added.iloc[:1], edited, added.iloc[1:]], ignore_index=True)
+    return edited.astype('string')
+
+
+@pytest.mark.parametrize('product', list(PRODUCTS))
+def test_incremental_matches_full_rerun(product, tmp_path):
+    clean = PRODUCTS[product]['clean']
+    df = read_bionumbers_file(EXPORT)
+    first, fingerprints, changes = incremental_clean_size_data(df, tmp_path, product, **clean)
+    assert changes['previous_output'] is None
+    save_run(tmp_path, product, first, fingerprints, '2000_01_01')
+
+    edited = edit_export(df, first['bion_id'])
+    size_data, _, changes = incremental_clean_size_data(edited, tmp_path, product, **clean)
+
+    assert changes['previous_output'] is not None
+    assert len(changes['added']) == 3
+    assert len(changes['changed']) == 3
+    assert len(changes['removed']) == 3
+    expected = clean_size_data(edited, **clean)
+    assert size_data.to_csv(index=False) == expected.to_csv(index=False)
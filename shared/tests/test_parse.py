@@ -0,0 +1,46 @@
+"""clean_size_data over the fixture export, batched and sharded."""
+import os
+
+import pandas as pd
+import pytest
+
+from shared.util import read_bionumbers_file
+from shared.bionumbers.parse import (
+    clean_size_data,
+    clean_size_data_batches,
+    clean_size_data_products
+)
+from shared.bionumbers.products import PRODUCTS
+
+EXPORT = os.path.join(os.path.dirname(__file__), 'fixtures', 'bionumbers_export.xls')
+
+
+def batches_of(df, batch_size):
+    return [df.iloc[start:start + batch_size] for start in range(0, len(df), batch_size)]
+
+
+def test_batches_warn_once_about_unknown_units(capsys):
+    df = read_bionumbers_file(EXPORT)
+    expected = clean_size_data(df)
+    whole_warning = capsys.readouterr().out
+
+    cleaned = clean_size_data_batches(batches_of(df, 20))
+    batched_warning = capsys.readouterr().out
+
+    pd.testing.assert_frame_equal(cleaned, expected)
+    assert whole_warning.count('Warning:') == 1
+    assert batched_warning == whole_warning
+
+
+@pytest.mark.parametrize('product', list(PRODUCTS))
+def test_sharded_csv_matches_serial(product):
+    df = read_bionumbers_file(EXPORT)
+    clean = PRODUCTS[product]['clean']
+    serial = clean_size_data(df, **clean).to_csv(index=False)
+
+    # Shards small enough that every worker gets several
+    sharded = clean_size_data(df, **clean, workers=2, shard_size=7)
+    products = clean_size_data_products(df, {product: clean}, workers=2, shard_size=7)
+
+    assert sharded.to_csv(index=False) == serial
+    assert products[product].to_csv(index=False) == serial
@@ -0,0 +1,64 @@
+"""build_bionumbers.py against the gen scripts it replaces, on the fixture export."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from shared.bionumbers.products import PRODUCTS
+
+REPO = Path(__file__).resolve().parents[2]
+WIP = REPO / 'WIP'
+EXPORT = Path(__file__).parent / 'fixtures' / 'bionumbers_export.xls'
+# Catalog fields that record when an output was written
+TIMESTAMP_FIELDS = {'mtime_ns', 'recorded_at'}
+
+
+def run_scripts(directory, *scripts):
+    """Run WIP scripts one after the other in a WIP-like directory holding the fixture export"""
+    samples = directory / 'shared' / 'bionumbers' / 'samples'
+    samples.mkdir(parents=True)
+    shutil.copy(EXPORT, samples / 'raw_full_BioNumbers.xls')
+    for product in PRODUCTS.values():
+        (directory / product['output_dir']).mkdir(parents=True, exist_ok=True)
+
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    for script in scripts:
+        subprocess.run(
+            [sys.executable, str(WIP / script)], cwd=directory, env=env,
+            check=True, stdout=subprocess.DEVNULL
+        )
+
+
+def without_timestamps(value):
+    if isinstance(value, dict):
+        return {k: without_timestamps(v) for k, v in value.items() if k not in TIMESTAMP_FIELDS}
+    return value
+
+
+def written_outputs(directory):
+    """Contents of every output file by path, catalogs without their timestamps"""
+    outputs = {}
+    for product in PRODUCTS.values():
+        for path in sorted((directory / product['output_dir']).iterdir()):
+            name = str(path.relative_to(directory))
+            if path.name == 'catalog.json':
+                outputs[name] = without_timestamps(json.loads(path.read_text()))
+            else:
+                outputs[name] = path.read_bytes()
+    return outputs
+
+
+def test_build_writes_what_the_gen_scripts_write(tmp_path):
+    run_scripts(tmp_path / 'build', 'build_bionumbers.py')
+    run_scripts(
+        tmp_path / 'separate',
+        'cell_size_dataset/gen_cell_sizes.py', 'cell_volume_dataset/gen_cell_volumes.py'
+    )
+
+    built = written_outputs(tmp_path / 'build')
+    # CSV, Parquet, interval index and fingerprints of each product, plus
+    # the subsets and the catalogs
+    assert len(built) == 14
+    assert built == written_outputs(tmp_path / 'separate')
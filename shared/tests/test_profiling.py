@@ -0,0 +1,34 @@
+"""Column profiles built one batch at a time."""
+import pandas as pd
+
+from shared.profiling import EXACT, HYPERLOGLOG, ColumnProfiler
+
+BATCHES = [
+    ['zeta', 'alpha', None, 'mid', 'zeta'],
+    ['beta', 'alpha', 'mid', 'omega', 'beta', 'alpha']
+]
+
+
+def profile(distinct, **kwargs):
+    profiler = ColumnProfiler(distinct, **kwargs)
+    for batch in BATCHES:
+        profiler.update(pd.Series(batch, dtype='string'))
+    return profiler
+
+
+def test_top_ties_keep_order_of_first_appearance():
+    result = profile(EXACT).result()
+    assert result['top'] == [['alpha', 3], ['zeta', 2], ['mid', 2], ['beta', 2], ['omega', 1]]
+    assert result['distinct'] == 5
+    assert result['top_error'] == 0
+
+
+def test_sketch_mode_keeps_at_most_capacity_counts():
+    profiler = profile(HYPERLOGLOG, top_k=2, capacity=3)
+    result = profiler.result()
+    assert len(profiler.counts) <= 3
+    assert result['distinct'] == 5
+    # Misra-Gries counts are low by at most top_error
+    exact = dict(profile(EXACT).result()['top'])
+    for value, count in result['top']:
+        assert exact[value] - result['top_error'] <= count <= exact[value]
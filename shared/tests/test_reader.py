@@ -0,0 +1,43 @@
+"""The streaming HTML reader against pandas.read_html, which it replaces."""
+import os
+
+import pandas as pd
+
+from shared.bionumbers.reader import iter_bionumbers_batches, read_bionumbers_html
+
+EXPORT = os.path.join(os.path.dirname(__file__), 'fixtures', 'bionumbers_export.xls')
+
+
+def read_html_export(filepath):
+    """The export as read_html parses it, with the first row as the header"""
+    df = pd.read_html(filepath)[0]
+    df.columns = [str(c) for c in df.iloc[0]]
+    return df.iloc[1:].reset_index(drop=True).astype('string')
+
+
+def test_reader_matches_read_html():
+    # The fixture has <br> inside cells, entities and nested tags
+    expected = read_html_export(EXPORT)
+
+    pd.testing.assert_frame_equal(read_bionumbers_html(EXPORT), expected)
+    pd.testing.assert_frame_equal(read_bionumbers_html(EXPORT, chunk_size=97), expected)
+
+
+def test_batches_concatenate_to_the_whole_export():
+    expected = read_bionumbers_html(EXPORT)
+    batches = list(iter_bionumbers_batches(EXPORT, batch_size=25, chunk_size=97))
+
+    assert [len(batch) for batch in batches] == [25, 25, 25, 25, 20]
+    pd.testing.assert_frame_equal(pd.concat(batches), expected)
+
+
+def test_line_breaks_separate_values(tmp_path):
+    path = tmp_path / 'export.xls'
+    path.write_text(
+        '<table><tr><td>bion_id</td><td>Value</td></tr>'
+        '<tr><td>1</td><td>1.5<br>2</td></tr>'
+        '<tr><td>2</td><td>x<br/>y &amp; <b>n<i>e</i>st</b></td></tr></table>',
+        encoding='utf-8'
+    )
+
+    assert read_bionumbers_html(path)['Value'].tolist() == ['1.5 2', 'x y & nest']
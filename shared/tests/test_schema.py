@@ -0,0 +1,45 @@
+"""Reading processed outputs back the way the analyzers do."""
+import os
+
+import pandas as pd
+
+from shared.util import read_bionumbers_file
+from shared.bionumbers.parse import clean_size_data
+from shared.bionumbers.products import PRODUCTS, save_output
+from shared.bionumbers.query import select, Equals
+from shared.bionumbers.schema import (
+    MEASUREMENT_TABLE_COLUMNS,
+    observed_counts,
+    read_selection
+)
+
+EXPORT = os.path.join(os.path.dirname(__file__), 'fixtures', 'bionumbers_export.xls')
+PRODUCT = 'processed_cell_volume_data'
+GENERIC = Equals('Organism', 'Generic')
+
+
+def test_read_selection_as_of(tmp_path):
+    size_data = clean_size_data(read_bionumbers_file(EXPORT), **PRODUCTS[PRODUCT]['clean'])
+    save_output(tmp_path, PRODUCT, size_data.iloc[:20], None, '2020_01_01')
+    save_output(tmp_path, PRODUCT, size_data, None, '2021_01_01')
+
+    path, df, selected = read_selection(tmp_path, PRODUCT, GENERIC, other_columns=['Organism'])
+    assert os.path.basename(path) == f"{PRODUCT}_2021_01_01.csv"
+    assert list(df.columns) == list(MEASUREMENT_TABLE_COLUMNS.values()) + ['Organism']
+    assert len(df) == len(size_data)
+    pd.testing.assert_frame_equal(selected, select(df, GENERIC))
+    assert len(selected)
+
+    path, df, _ = read_selection(tmp_path, PRODUCT, GENERIC, other_columns=['Organism'], as_of='2020-06-30')
+    assert os.path.basename(path) == f"{PRODUCT}_2020_01_01.csv"
+    assert len(df) == 20
+
+
+def test_observed_counts_keep_ties_in_order_of_appearance():
+    organisms = ['zeta', 'alpha', 'mid', 'alpha', 'zeta', 'mid', 'beta']
+    categorical = pd.Series(pd.Categorical(organisms, categories=['alpha', 'beta', 'mid', 'zeta', 'unused']))
+
+    for column in [categorical, categorical.astype('string')]:
+        counts = observed_counts(column)
+        assert counts.index.tolist() == ['zeta', 'alpha', 'mid', 'beta']
+        assert counts.tolist() == [2, 2, 2, 1]
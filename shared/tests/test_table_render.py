@@ -0,0 +1,36 @@
+"""render_table driven by the command-line options analyzers share."""
+import argparse
+
+import pandas as pd
+
+from shared.table_render import (
+    add_table_arguments,
+    render_options,
+    render_table,
+    table_source_columns
+)
+
+TABLE_COLUMNS = {"Name": 'name', "Value": 'value'}
+
+
+def test_table_source_columns():
+    assert table_source_columns(TABLE_COLUMNS, ['name', 'category']) == ['name', 'value', 'category']
+    assert table_source_columns(['a', 'b']) == ['a', 'b']
+
+
+def test_table_arguments_drive_render_table(tmp_path):
+    parser = argparse.ArgumentParser()
+    add_table_arguments(parser)
+    output = tmp_path / 'table.csv'
+    args = parser.parse_args([
+        '--table-format', 'csv', '--max-width', '4', '--page-size', '2', '--page', '1',
+        '--table-output', str(output)
+    ])
+    df = pd.DataFrame({'name': ['alpha', 'beta', 'gamma', 'delta'], 'value': [1.5, None, 3.0, 4.0]})
+
+    written = render_table(df, TABLE_COLUMNS, na_rep={'value': ''}, **render_options(args))
+
+    assert written == 2
+    assert output.read_text().splitlines() == ['Name,Value', 'gamm,3.0', 'delt,4.0']
+    defaults = render_options(parser.parse_args([]))
+    assert defaults == dict(fmt='fixed', max_width=40, page_size=None, page=None, out=None)
@@ -0,0 +1,62 @@
+"""extract_numeric_columns against extract_numeric_value, which it vectorizes."""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.util import (
+    PARSE_NONE,
+    PARSE_RANGE,
+    PARSE_SINGLE,
+    extract_numeric_columns,
+    extract_numeric_value
+)
+
+# Pieces that exercise the patterns: digit runs and dots, both separators,
+# URLs, Unicode whitespace and digits re treats as \d
+PIECES = list('0123456789.- to abx\n\t~') + [
+    'http://x.y/1-2 ', 'www.a5 ', 'f3.pdf ', ' to ', '±', '1e-3', '..', '-.5',
+    '12345678901234567890', '\xa0', ' ', ' ', '\x1c', '٣', '۵.٧'
+]
+EDGE_CASES = [
+    '1.2.3-4', '.5.3', '5.-3', '1 to 2 - 3', '3-http://a.b/4 5', '2\n-\n7',
+    'www.x.org 1-2', '12-', '-', '', ' ', '٣-٤', '1\xa0to\xa02', 3.5, 7,
+    None, np.nan, pd.NA
+]
+
+
+def random_values(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 12)))
+        for _ in range(count)
+    ]
+
+
+def expected_columns(values):
+    """extract_numeric_value row by row, in the layout extract_numeric_columns uses"""
+    rows = []
+    for value in values:
+        parsed = extract_numeric_value(value)
+        if isinstance(parsed, tuple):
+            rows.append((np.nan, *parsed, PARSE_RANGE))
+        elif parsed is not None:
+            rows.append((parsed, np.nan, np.nan, PARSE_SINGLE))
+        else:
+            rows.append((np.nan, np.nan, np.nan, PARSE_NONE))
+    return pd.DataFrame(rows, columns=['value', 'min_value', 'max_value', 'kind']).astype({'kind': 'int8'})
+
+
+@pytest.mark.parametrize('dtype', ['string', object])
+def test_columns_match_extract_numeric_value(dtype):
+    strings = random_values(20000) + [v for v in EDGE_CASES if isinstance(v, str)]
+    values = pd.Series(strings + strings[:100], dtype=dtype)
+
+    pd.testing.assert_frame_equal(extract_numeric_columns(values), expected_columns(values))
+
+
+def test_values_that_are_not_strings():
+    values = pd.Series(EDGE_CASES, dtype=object)
+
+    pd.testing.assert_frame_equal(extract_numeric_columns(values), expected_columns(values))
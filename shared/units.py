@@ -0,0 +1,156 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from shared.distinct import take_distinct
+
+
+LENGTH = 'length'
+AREA = 'area'
+VOLUME = 'volume'
+
+# SI unit each dimension is standardized to
+STANDARD_UNITS = {
+    LENGTH: 'm',
+    AREA: 'm²',
+    VOLUME: 'm³'
+}
+
+# SI prefixes as powers of ten, keyed by their normalized symbol
+SI_PREFIXES = {
+    '': 0,
+    'k': 3,
+    'd': -1,
+    'c': -2,
+    'm': -3,
+    'µ': -6,
+    'n': -9,
+    'p': -12,
+    'f': -15
+}
+
+# Prefixable base units: symbol -> (dimension, power of ten of the unit in
+# SI, power the prefix is raised to). 1 L = 1e-3 m³ and the prefix of a
+# litre is not cubed, unlike the prefix of a cubic metre.
+BASE_UNITS = {
+    'm': (LENGTH, 0, 1),
+    'm²': (AREA, 0, 2),
+    'm³': (VOLUME, 0, 3),
+    'l': (VOLUME, -3, 1)
+}
+
+# Units outside the prefix scheme, as normalized by normalize_unit
+EXTRA_UNITS = {
+    'å³': (VOLUME, -30),
+    'angstrom': (LENGTH, -10),
+    'angstroms': (LENGTH, -10),
+    'micron': (LENGTH, -6),
+    'microns': (LENGTH, -6),
+    'liter': (VOLUME, -3),
+    'liters': (VOLUME, -3),
+    'litre': (VOLUME, -3),
+    'litres': (VOLUME, -3)
+}
+
+
+def normalize_unit(unit_str, debug=False):
+    """Normalize unit string to handle different micro symbols and other variations"""
+    if pd.isna(unit_str):
+        return unit_str
+
+    # First replace micro symbols while preserving case
+    unit = unit_str.replace('μ', 'µ')     # Standard micro
+    unit = unit.replace('Î¼', 'µ')        # Corrupted micro
+
+    # Now convert to lowercase and strip whitespace
+    unit = unit.lower().strip()
+
+    # Replace 'u' with 'µ' only at the start of unit or after a separator
+    unit = re.sub(r'(^|[\s/])u([m|g|l])', r'\1µ\2', unit)
+
+    # Remove any spaces before units
+    unit = re.sub(r'\s+([²³]|sec|min|hr|/)', r'\1', unit)
+
+    # Standardize superscripts
+    unit = unit.replace('^2', '²')
+    unit = unit.replace('^3', '³')
+
+    # Standardize Angstroms
+    unit = unit.replace('å', 'a')  # Convert å to a
+    unit = re.sub(r'a\^3|a³', 'å³', unit)  # Standardize to å³
+    unit = re.sub(r'[aA]\^3|[aA]³', 'å³', unit)  # Handle both cases
+
+    # Debug output
+    if debug and unit_str != unit:
+        print(f"Normalized unit: '{unit_str}' -> '{unit}'")
+
+    return unit
+
+
+def _power_of_ten(exponent):
+    """10**exponent, correctly rounded (10.0 ** -18 is not exactly 1e-18)"""
+    return float(f"1e{exponent}")
+
+
+def build_unit_registry():
+    """Map every known normalized unit to (factor to SI, dimension)"""
+    registry = {}
+    for prefix, prefix_exp in SI_PREFIXES.items():
+        for base, (dimension, base_exp, power) in BASE_UNITS.items():
+            factor = _power_of_ten(prefix_exp * power + base_exp)
+            registry[prefix + base] = (factor, dimension)
+    for unit, (dimension, exponent) in EXTRA_UNITS.items():
+        registry[unit] = (_power_of_ten(exponent), dimension)
+    return registry
+
+
+UNIT_REGISTRY = build_unit_registry()
+
+
+def lookup_units(units, debug=False):
+    """Conversion factors and dimensions for a column of unit strings
+
+    Each distinct unit is normalized and looked up in UNIT_REGISTRY once,
+    then the results are mapped back onto the rows. Returns (factor,
+    dimension, unknown): factor is NaN and dimension None for rows whose
+    unit is missing or unknown, and unknown counts rows per unknown unit.
+    """
+    codes, uniques = pd.factorize(units)
+    normalized = [normalize_unit(u, debug=debug) for u in uniques]
+    entries = [UNIT_REGISTRY.get(u, (np.nan, None)) for u in normalized]
+    factors = np.array([factor for factor, _ in entries], dtype=float)
+    dimensions = np.array([dimension for _, dimension in entries], dtype=object)
+
+    is_unknown = np.array([dimension is None for _, dimension in entries], dtype=bool)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    unknown = pd.Series(
+        counts[is_unknown], index=pd.Index(uniques[is_unknown], name='unit'), name='rows'
+    ).sort_values(ascending=False)
+
+    return take_distinct(codes, factors, np.nan), take_distinct(codes, dimensions), unknown
+
+
+def convert_unit_columns(df, value_columns, unit_column='Units', debug=False):
+    """Convert several value columns that share a unit column to SI
+
+    Returns (standardized, dimension, unknown): a frame with one converted
+    column per entry in value_columns, the dimension of each row and the
+    row counts of unknown units (see lookup_units).
+    """
+    factor, dimension, unknown = lookup_units(df[unit_column], debug=debug)
+    standardized = pd.DataFrame({
+        column: df[column].to_numpy(dtype=float) * factor
+        for column in value_columns
+    }, index=df.index)
+    return standardized, pd.Series(dimension, index=df.index), unknown
+
+
+def standardize_units(value, unit, debug=False):
+    """Convert a single measurement to SI (meters, square or cubic meters)"""
+    if pd.isna(value) or pd.isna(unit):
+        return None
+    factor, _ = UNIT_REGISTRY.get(normalize_unit(unit, debug=debug), (None, None))
+    if factor is None:
+        return None
+    return value * factor
@@ -2,32 +2,207 @@ import pandas as pd
 import numpy as np
 import re
 import os
+import hashlib
+import itertools
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
-def load_bionumbers_data(
-    filepath: str = "shared/bionumbers/samples/raw_full_BioNumbers.xls"
-):
-    """Load the Bionumbers data from file (supports Excel and HTML formats)"""
+from shared.distinct import map_distinct
+from shared.bionumbers.reader import (
+    detect_file_format,
+    iter_bionumbers_batches,
+    read_bionumbers_html
+)
+# Unit handling lives in shared.units, re-exported here for existing imports
+from shared.units import (
+    normalize_unit,
+    standardize_units
+)
+
+
+BIONUMBERS_RAW_PATH = "shared/bionumbers/samples/raw_full_BioNumbers.xls"
+
+# Bump this whenever the parsing below changes so stale caches are ignored
+BIONUMBERS_CACHE_VERSION = 3
+
+# Raw rows per record batch when streaming the export
+BATCH_SIZE = 10000
+
+
+def file_content_hash(filepath, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bionumbers_cache_path(filepath, cache_dir=None, content_hash=None):
+    """Path of the Parquet cache for the current contents of filepath"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(filepath), 'cache')
+    if content_hash is None:
+        content_hash = file_content_hash(filepath)
+    name = f"bionumbers_v{BIONUMBERS_CACHE_VERSION}_{content_hash[:16]}.parquet"
+    return os.path.join(cache_dir, name)
+
+
+def _read_bionumbers_table(filepath):
+    # The export is usually HTML saved with an .xls extension, so sniff the
+    # format instead of letting read_excel fail first
+    if detect_file_format(filepath) == 'html':
+        return read_bionumbers_html(filepath)
     try:
-        # First try reading as Excel
-        print(f"Loading Bionumbers data from {os.path.join(os.getcwd(), filepath)}")
-        return pd.read_excel(
-            os.path.join(
-                os.getcwd(),
-                filepath
-            )
-        )
+        return pd.read_excel(filepath)
     except Exception as e:
         print(f"Warning: Could not read as Excel file ({e})")
         print("Attempting to read as HTML...")
-        # Try reading as HTML table and set the first row as headers
-        df = pd.read_html(filepath)[0]
-        # Set the first row as column headers
-        df.columns = df.iloc[0]
-        # Remove the first row since it's now the header
-        df = df.iloc[1:].reset_index(drop=True)
+        return read_bionumbers_html(filepath)
+
+
+def read_bionumbers_file(filepath):
+    """Parse the raw Bionumbers export (supports Excel and HTML formats)
+
+    Column names and values are always strings, whichever format the
+    export is in, so every loading path returns the same types.
+    """
+    df = _read_bionumbers_table(filepath)
+    df.columns = [str(c) for c in df.columns]
+    return df.astype('string')
+
+
+def load_bionumbers_data(
+    filepath: str = BIONUMBERS_RAW_PATH,
+    use_cache: bool = True,
+    cache_dir: str = None
+):
+    """Load the Bionumbers data, reusing a Parquet cache keyed by file content
+
+    The cache file name embeds a hash of the raw export, so a new export is
+    parsed once and every later load reads the typed columnar copy instead.
+    The hash is also kept in df.attrs['source_hash'] for output catalogs.
+    """
+    filepath = os.path.join(os.getcwd(), filepath)
+    print(f"Loading Bionumbers data from {filepath}")
+    content_hash = file_content_hash(filepath)
+    if not use_cache:
+        df = read_bionumbers_file(filepath)
+        df.attrs['source_hash'] = content_hash
         return df
 
+    cache_path = bionumbers_cache_path(filepath, cache_dir, content_hash)
+    if os.path.exists(cache_path):
+        try:
+            df = pd.read_parquet(cache_path)
+            print(f"Loaded cached Bionumbers data from {cache_path}")
+            df.attrs['source_hash'] = content_hash
+            return df
+        except Exception as e:
+            print(f"Warning: Could not read cache file ({e}), reparsing")
+
+    df = read_bionumbers_file(filepath)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        df.to_parquet(cache_path, index=False)
+        print(f"Cached Bionumbers data to {cache_path}")
+    except Exception as e:
+        print(f"Warning: Could not write cache file ({e})")
+    df.attrs['source_hash'] = content_hash
+    return df
+
+
+def _slice_batches(df, batch_size):
+    for start in range(0, max(len(df), 1), batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+def _cached_batches(cache_path, batch_size):
+    parquet = pq.ParquetFile(cache_path)
+    start = 0
+    for record_batch in parquet.iter_batches(batch_size=batch_size):
+        batch = pa.Table.from_batches([record_batch]).to_pandas()
+        batch.index = pd.RangeIndex(start, start + len(batch))
+        start += len(batch)
+        yield batch
+    if start == 0:
+        yield parquet.schema_arrow.empty_table().to_pandas()
+
+
+def _parsed_batches(filepath, batch_size, cache_path):
+    # Only HTML exports can be parsed incrementally; Excel files are read
+    # whole and sliced
+    if detect_file_format(filepath) == 'html':
+        batches = iter_bionumbers_batches(filepath, batch_size=batch_size)
+    else:
+        batches = _slice_batches(read_bionumbers_file(filepath), batch_size)
+
+    # Write the cache as the batches go by and publish it only once the
+    # whole export has been parsed
+    tmp_path = f"{cache_path}.tmp"
+    writer = None
+    try:
+        for batch in batches:
+            if cache_path is not None:
+                try:
+                    table = pa.Table.from_pandas(batch, preserve_index=False)
+                    if writer is None:
+                        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                        writer = pq.ParquetWriter(tmp_path, table.schema)
+                    writer.write_table(table)
+                except Exception as e:
+                    print(f"Warning: Could not write cache file ({e})")
+                    cache_path = None
+            yield batch
+        if cache_path is not None and writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_path, cache_path)
+            print(f"Cached Bionumbers data to {cache_path}")
+    finally:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+
+
+def iter_bionumbers_data(
+    filepath: str = BIONUMBERS_RAW_PATH,
+    batch_size: int = BATCH_SIZE,
+    use_cache: bool = True,
+    cache_dir: str = None
+):
+    """Stream the Bionumbers data as string-typed record batches
+
+    Batches come from the same Parquet cache as load_bionumbers_data, and a
+    missing cache is written while the export is parsed, so concatenating
+    the batches gives the frame load_bionumbers_data returns. Each batch has
+    the raw file's hash in batch.attrs['source_hash'].
+    """
+    filepath = os.path.join(os.getcwd(), filepath)
+    print(f"Streaming Bionumbers data from {filepath}")
+    content_hash = file_content_hash(filepath)
+    cache_path = None
+    batches = None
+    if use_cache:
+        cache_path = bionumbers_cache_path(filepath, cache_dir, content_hash)
+        if os.path.exists(cache_path):
+            try:
+                batches = _cached_batches(cache_path, batch_size)
+                first = next(batches)
+                print(f"Streaming cached Bionumbers data from {cache_path}")
+                batches = itertools.chain([first], batches)
+            except Exception as e:
+                print(f"Warning: Could not read cache file ({e}), reparsing")
+                batches = None
+    if batches is None:
+        batches = _parsed_batches(filepath, batch_size, cache_path)
+
+    for batch in batches:
+        batch.attrs['source_hash'] = content_hash
+        yield batch
+
 
 def extract_numeric_value(value_str):
     """Extract numeric values from string, handling ranges and single values"""
@@ -71,79 +246,115 @@ def extract_numeric_value(value_str):
     return None
 
 
-def normalize_unit(unit_str):
-    """Normalize unit string to handle different micro symbols and other variations"""
-    if pd.isna(unit_str):
-        return unit_str
+# Column-wide versions of the patterns in extract_numeric_value, run by
+# pyarrow's RE2 engine over all distinct values at once. RE2 finds the same
+# leftmost match as re.search, without backtracking, but its \s is ASCII
+# only, so Python's Unicode whitespace is spelled out. Its \p{Nd} follows a
+# newer Unicode database than re's \d, so digits are [0-9] here and values
+# with any other decimal digit are parsed one at a time instead.
+_SPACE = r'[\t-\r\x1c-\x1f\x85\p{Z}]'
+_NON_SPACE = r'[^\t-\r\x1c-\x1f\x85\p{Z}]'
+_NUMBER = r'[0-9]*\.?[0-9]+'
+_COLUMN_URL_PATTERN = f'https?://{_NON_SPACE}+|www\\.{_NON_SPACE}+|{_NON_SPACE}+\\.pdf'
+# Every URL match contains one of these, so only such values are rewritten
+_URL_LITERALS = r'http|www\.|\.pdf'
+# Each range pattern is paired with a literal every match must contain, so
+# only candidate values are scanned
+_COLUMN_RANGE_PATTERNS = [
+    (separator, f'(?P<low>{_NUMBER}){_SPACE}*{separator}{_SPACE}*(?P<high>{_NUMBER})')
+    for separator in ('-', 'to')
+]
+# The first number (?<!\d)(\d*\.?\d+)(?!\d) finds starts at the first digit,
+# or at the dot before it, and takes the digits after one more dot
+_COLUMN_NUMBER_PATTERN = r'(?P<value>[0-9]+(?:\.[0-9]+)?|\.[0-9]+)'
+_NON_ASCII_DIGIT = r'[^\P{Nd}0-9]'
 
-    # First replace micro symbols while preserving case
-    unit = unit_str.replace('μ', 'µ')     # Standard micro
-    unit = unit.replace('Î¼', 'µ')        # Corrupted micro
-    
-    # Now convert to lowercase and strip whitespace
-    unit = unit.lower().strip()
-    
-    # Replace 'u' with 'µ' only at the start of unit or after a separator
-    unit = re.sub(r'(^|[\s/])u([m|g|l])', r'\1µ\2', unit)
-    
-    # Remove any spaces before units
-    unit = re.sub(r'\s+([²³]|sec|min|hr|/)', r'\1', unit)
-    
-    # Standardize superscripts
-    unit = unit.replace('^2', '²')
-    unit = unit.replace('^3', '³')
-    
-    # Standardize Angstroms
-    unit = unit.replace('å', 'a')  # Convert å to a
-    unit = re.sub(r'a\^3|a³', 'å³', unit)  # Standardize to å³
-    unit = re.sub(r'[aA]\^3|[aA]³', 'å³', unit)  # Handle both cases
-    
-    # Debug output
-    if unit_str != unit:
-        print(f"Normalized unit: '{unit_str}' -> '{unit}'")
-        
-    return unit
+# Parse-kind codes returned by extract_numeric_columns
+PARSE_NONE = 0
+PARSE_SINGLE = 1
+PARSE_RANGE = 2
 
 
-def standardize_units(value, unit):
-    """Convert measurements to standard units (meters or cubic meters)"""
-    if pd.isna(value) or pd.isna(unit):
-        return None
+def _match_groups(strings, pattern, candidates):
+    """Groups of the first match of pattern in each candidate string
+
+    Returns the candidates that matched and a float array with one column
+    per named group of pattern.
+    """
+    matches = pc.extract_regex(strings.take(candidates), pattern)
+    matched = pc.is_valid(matches).to_numpy(zero_copy_only=False)
+    matches = matches.filter(matched)
+    groups = np.column_stack([
+        pc.cast(group, pa.float64()).to_numpy() for group in matches.flatten()
+    ])
+    return candidates[matched], groups
+
+
+def _parse_distinct(uniques):
+    """(value, min_value, max_value, kind) arrays for distinct values"""
+    n = len(uniques)
+    kind = np.full(n, PARSE_NONE, dtype='int8')
+    value = np.full(n, np.nan)
+    min_value = np.full(n, np.nan)
+    max_value = np.full(n, np.nan)
+    if not n:
+        return value, min_value, max_value, kind
+
+    try:
+        strings = pa.array(uniques, type=pa.large_string())
+    except pa.ArrowTypeError:
+        # Values that are not strings are parsed as their str(), as
+        # extract_numeric_value does
+        strings = pa.array([str(v) for v in uniques], type=pa.large_string())
+    has_url = pc.match_substring_regex(strings, _URL_LITERALS)
+    if pc.any(has_url).as_py():
+        strings = pc.replace_with_mask(strings, has_url, pc.replace_substring_regex(
+            strings.filter(has_url), _COLUMN_URL_PATTERN, ''
+        ))
+
+    todo = np.ones(n, dtype=bool)
+    if not pc.all(pc.string_is_ascii(strings)).as_py():
+        other_digits = pc.match_substring_regex(strings, _NON_ASCII_DIGIT)
+        for i in np.flatnonzero(other_digits.to_numpy(zero_copy_only=False)):
+            parsed = extract_numeric_value(uniques[i])
+            if isinstance(parsed, tuple):
+                min_value[i], max_value[i] = parsed
+                kind[i] = PARSE_RANGE
+            elif parsed is not None:
+                value[i] = parsed
+                kind[i] = PARSE_SINGLE
+            todo[i] = False
+
+    for literal, pattern in _COLUMN_RANGE_PATTERNS:
+        has_literal = pc.match_substring(strings, literal).to_numpy(zero_copy_only=False)
+        rows, groups = _match_groups(strings, pattern, np.flatnonzero(todo & has_literal))
+        min_value[rows] = groups.min(axis=1)
+        max_value[rows] = groups.max(axis=1)
+        kind[rows] = PARSE_RANGE
+        todo[rows] = False
+
+    rows, groups = _match_groups(strings, _COLUMN_NUMBER_PATTERN, np.flatnonzero(todo))
+    value[rows] = groups[:, 0]
+    kind[rows] = PARSE_SINGLE
+    return value, min_value, max_value, kind
+
+
+def extract_numeric_columns(values):
+    """Vectorized extract_numeric_value over a whole column
 
-    unit = normalize_unit(unit)
-
-    # Expanded unit conversion factors
-    conversion = {
-        # Length units
-        'µm': 1e-6,
-        'nm': 1e-9,
-        'mm': 1e-3,
-        'cm': 1e-2,
-        'm': 1.0,
-        # Volume units
-        'µm³': 1e-18,
-        'nm³': 1e-27,
-        'mm³': 1e-9,
-        'cm³': 1e-6,
-        'm³': 1.0,
-        'fl': 1e-15,    # 1 fL = 1e-15 L = 1e-18 m³
-        'pl': 1e-12,    # 1 pL = 1e-12 L = 1e-15 m³
-        'nl': 1e-9,     # 1 nL = 1e-9 L = 1e-12 m³
-        'µl': 1e-6,     # 1 µL = 1e-6 L = 1e-9 m³
-        'ml': 1e-3,     # 1 mL = 1e-3 L = 1e-6 m³
-        'l': 1.0,       # 1 L = 1e-3 m³
-        'å³': 1e-30,    # 1 Å³ = (1e-10 m)³ = 1e-30 m³
-        # Area units
-        'µm²': 1e-12,
-        'nm²': 1e-18,
-        'mm²': 1e-6,
-        'cm²': 1e-4,
-        'm²': 1.0
-    }
-
-    if unit in conversion:
-        # For volume units in liters, convert to cubic meters
-        if unit in ['fl', 'pl', 'nl', 'µl', 'ml', 'l']:
-            return value * conversion[unit] * 1e-3  # Convert L to m³
-        return value * conversion[unit]
-    return value
+    Returns a frame aligned with values holding the point value (single
+    numbers only), the range min/max (ranges only) and a parse-kind code
+    (PARSE_NONE, PARSE_SINGLE or PARSE_RANGE). Each distinct value is parsed
+    once, and every pattern runs over all of them at once in pyarrow.
+    On 300k mostly distinct values this is about 10x faster than
+    extract_numeric_value row by row (shared/benchmarks/extract_numeric.py).
+    """
+    value, min_value, max_value, kind = map_distinct(
+        values, _parse_distinct, missing=(np.nan, np.nan, np.nan, PARSE_NONE)
+    )
+    return pd.DataFrame({
+        'value': value,
+        'min_value': min_value,
+        'max_value': max_value,
+        'kind': kind
+    }, index=values.index)